@@ -1,49 +1,264 @@
+import os
+import math
 import time  # 用于时间记录
-import psutil  # 用于内存监控
 import hashlib
+import itertools
+import logging
 import threading
 import numpy as np
 from i18n import I18n
 import multiprocessing
-from queue import Queue
+from queue import PriorityQueue, Empty
 import onnxruntime as ort
-from collections import OrderedDict
 from db_manager import DatabaseManager
-from constants import IMAGE_MODEL_FILE, IMAGE_THRESHOLD
+from config_rules import read_config
+from image_cache import ShardedCache, PerceptualHashIndex, PersistentVerdictStore, compute_image_hash, compute_phash
+from preprocess import PreprocessPool, PreparedImage, TensorRing, normalize_into, resize_for_model, to_rgb_array
+from image_prefilter import ImagePreFilter
+from memory_pressure import MemoryPressureMonitor
+from skin_filter import SkinToneFilter, compute_skin_features
+from gif_sampling import GIF_SAMPLER_VERSION, sample_gif_frames
+from prediction import PredictionResult, threshold_config_key
+from constants import (IMAGE_MODEL_FILE, IMAGE_MODEL_VARIANTS, IMAGE_MODEL_PREFERENCE,
+                       IMAGE_LABELS, IMAGE_INPUT_SIZE)
 from concurrent.futures import ThreadPoolExecutor, Future, wait
 
+# 未指定优先级时使用的默认优先级，数值越小越先处理
+DEFAULT_PRIORITY = 0.0
+
+# 内存压力下每次检查淘汰的缓存比例
+CACHE_TRIM_FRACTION = 0.1
+
+# 共享会话模式下会话字典使用的键
+SHARED_SESSION_KEY = 'shared'
+# 帧通道线程共用的会话在会话字典中使用的键
+FRAME_SESSION_KEY = 'frame'
+# 帧通道线程名前缀，用于在 get_session 中识别帧通道线程
+FRAME_THREAD_PREFIX = 'gif-frame'
+
+EXECUTION_MODES = {
+    'sequential': ort.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': ort.ExecutionMode.ORT_PARALLEL,
+}
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+class PriorityThreadPool:
+    """按优先级调度任务的线程池
+
+    与 ThreadPoolExecutor 接口相近，submit 时额外指定优先级，数值越小越先执行，
+    相同优先级按提交顺序执行。突发请求时用户实际看到的图片先于跟踪像素等被处理。
+    """
+    def __init__(self, max_workers):
+        self.queue = PriorityQueue()  # (优先级, 提交序号, future, 函数, 参数)
+        self.counter = itertools.count()  # 提交序号，保证同优先级先进先出且不比较 future
+        self.lock = threading.Lock()
+        self.is_shutdown = False
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(max_workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, priority, fn, *args):
+        """提交任务，返回 concurrent.futures.Future"""
+        with self.lock:
+            if self.is_shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            future = Future()
+            self.queue.put((priority, next(self.counter), future, fn, args))
+        return future
+
+    def _worker(self):
+        """工作线程：按优先级取出任务执行，取到结束标记时退出"""
+        while True:
+            _, _, future, fn, args = self.queue.get()
+            if future is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue  # 任务已被取消
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        """关闭线程池，结束标记排在所有任务之后，已提交的任务仍会执行完"""
+        with self.lock:
+            self.is_shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        _, _, future, _, _ = self.queue.get_nowait()
+                    except Empty:
+                        break
+                    future.cancel()
+            for _ in self.threads:
+                self.queue.put((math.inf, next(self.counter), None, None, None))
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+class BatchScheduler:
+    """自适应批处理调度器
+    
+    根据队列深度和观测到的单张图像推理耗时决定每批次的大小，
+    保证队首图像的等待时间加上推理时间不超过延迟目标(SLO)。
+    """
+    def __init__(self, max_batch_size, latency_slo):
+        self.max_batch_size = max_batch_size  # 批次大小上限
+        self.latency_slo = latency_slo  # 单张图像延迟目标（秒）
+        self.per_image_cost = None  # 单张图像推理耗时的指数滑动平均（秒）
+        self.smoothing = 0.2  # 滑动平均系数
+        self.slo_miss_count = 0  # 超出延迟目标的图像数量
+        self.lock = threading.Lock()
+
+    def batch_limit(self, oldest_wait):
+        """根据队首图像已等待的时间计算本批次最多收集的图像数量
+        
+        Args:
+            oldest_wait: 队首图像已等待的时间（秒）
+        """
+        with self.lock:
+            cost = self.per_image_cost
+        if cost is None:
+            # 尚无耗时数据，先按单张处理以获得首个观测值
+            return 1
+        remaining = self.latency_slo - oldest_wait
+        if remaining <= cost:
+            # 已无法满足延迟目标，以最大批次尽快消化积压
+            return self.max_batch_size
+        return max(1, min(self.max_batch_size, int(remaining / cost)))
+
+    def record(self, batch_size, elapsed, waits):
+        """记录一次批量推理的耗时，更新单张图像耗时估计
+        
+        Args:
+            batch_size: 批次大小
+            elapsed: 批量推理耗时（秒）
+            waits: 批次内每张图像在队列中的等待时间（秒）
+        """
+        cost = elapsed / batch_size
+        with self.lock:
+            if self.per_image_cost is None:
+                self.per_image_cost = cost
+            else:
+                self.per_image_cost += self.smoothing * (cost - self.per_image_cost)
+            self.slo_miss_count += sum(1 for wait_time in waits if wait_time + elapsed > self.latency_slo)
+
+    def stats(self):
+        """返回超出延迟目标的图像数量和单张图像耗时估计（秒，尚无数据时为 None）"""
+        with self.lock:
+            return self.slo_miss_count, self.per_image_cost
+
 class ImagePredictor:
     def __init__(self, logger):
             self.logger = logger
             # 初始化线程池和会话管理
             cpu_count = multiprocessing.cpu_count()
             self.max_workers = min(cpu_count * 2, 8)
-            self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            self.executor = PriorityThreadPool(self.max_workers)  # 图片任务按优先级调度
+            # 动图帧使用独立的帧通道，避免图片任务占满线程池后等待自己的帧任务
+            frame_workers = max(2, self.max_workers // 2)
+            self.frame_executor = ThreadPoolExecutor(max_workers=frame_workers, thread_name_prefix=FRAME_THREAD_PREFIX)
+            self.frame_slots = threading.BoundedSemaphore(frame_workers * 2)  # 帧通道中最多排队的任务数
             self.sessions = {}
             self.session_lock = threading.Lock()
             
-            # 优化1: 使用OrderedDict实现LRU缓存，而不是简单的字典
-            self.image_cache = OrderedDict()  # 用于存储图像预测结果的缓存
-            self.cache_lock = threading.Lock()  # 用于保护缓存的线程锁
-            self.max_cache_size = 1000  # 最大缓存项数
-            
             # 批处理相关
             self.db = DatabaseManager()
+            
+            # 图像像素哈希 -> 检测结果的缓存，按字节预算限制容量
+            cache_shards = self._get_config('cache_shard_count', int)
+            self.image_cache = ShardedCache(self._get_config('image_cache_budget_kb', int) * 1024, cache_shards)
+            
+            # 感知哈希缓存：重新编码或换CDN的相似图片复用已有结果
+            self.phash_index = None
+            if self._get_config('enable_phash_cache') == '1':
+                self.phash_index = PerceptualHashIndex(
+                    self._get_config('phash_max_distance', int),
+                    self._get_config('phash_cache_size', int)
+                )
+            
+            # 原始内容缓存：以响应内容摘要为键，命中时无需解码和缩放图片
+            self.content_cache = ShardedCache(self._get_config('content_cache_budget_kb', int) * 1024, cache_shards)
+            # 缓存验证头(URL+ETag+长度) -> 内容摘要，命中时连摘要都无需计算
+            self.validator_cache = ShardedCache(self._get_config('content_cache_budget_kb', int) * 1024, cache_shards)
             self.enable_batch_processing = self._get_batch_config()  # 从数据库读取配置
-            self.batch_size = 8  # 批处理大小
-            self.batch_timeout = 0.1  # 批处理等待超时时间（秒）
-            self.batch_queue = Queue()  # 批处理队列
+            self.batch_scheduler = BatchScheduler(
+                self._get_config('batch_max_size', int),
+                self._get_config('batch_latency_slo_ms', int) / 1000.0
+            )  # 自适应批处理调度器
+            self.batch_queue = PriorityQueue()  # 批处理队列：(优先级, 入队序号, 图像)
+            self.batch_counter = itertools.count()  # 入队序号，同优先级按入队顺序处理
             self.batch_results = {}  # 存储批处理结果
             self.batch_lock = threading.Lock()  # 批处理锁
             
+            # 推理后端：thread 在本进程线程池中预处理，process 将解码和预处理放到子进程
+            self.preprocess_pool = None
+            if self._get_config('inference_backend') == 'process':
+                workers = self._get_config('preprocess_workers', int) or max(1, cpu_count // 2)
+                self.preprocess_pool = PreprocessPool(workers, self._get_config('tensor_ring_slots', int))
+            # 本进程预处理使用的张量环，归一化结果直接写入预分配的槽位
+            self.tensor_ring = TensorRing(self._get_config('tensor_ring_slots', int), shared=False)
+            # 批次槽位不连续或来自不同张量环时用于拼接批次的预分配缓冲区
+            self.batch_buffer = np.empty((self.batch_scheduler.max_batch_size, *IMAGE_INPUT_SIZE, 3), dtype=np.float32)
+            
+            # 图片头预过滤：跟踪像素、小图标等不进入推理流程
+            self.prefilter = ImagePreFilter(
+                self._get_config('prefilter_min_side', int),
+                self._get_config('prefilter_min_pixels', int),
+                self._get_config('prefilter_min_bytes', int)
+            )
+            
+            # 肤色预分类：明显安全的图片不经模型直接放行
+            self.skin_filter = None
+            if self._get_config('enable_skin_filter') == '1':
+                self.skin_filter = SkinToneFilter(
+                    self._get_config('skin_filter_max_ratio', float),
+                    self._get_config('skin_filter_flat_coverage', float),
+                    self._get_config('skin_filter_flat_max_ratio', float)
+                )
+            
+            # 各标签的判定阈值，按 IMAGE_LABELS 顺序排列
+            self.label_thresholds = np.array(
+                [self._get_config(threshold_config_key(label), float) for label in IMAGE_LABELS],
+                dtype=np.float32
+            )
+            
+            # 动图抽帧配置
+            self.gif_sample_strategy = self._get_config('gif_sample_strategy')
+            self.gif_max_frames = max(1, self._get_config('gif_max_frames', int))
+            self.gif_frame_stride = max(1, self._get_config('gif_frame_stride', int))
+            self.gif_scene_threshold = self._get_config('gif_scene_threshold', float)
+            
             # 优化2-1: 懒加载模型相关 - 只保存路径，不立即加载
-            self.model_path = IMAGE_MODEL_FILE
+            self.model_path = self._select_model_path()
             self.model_initialized = False  # 标记模型是否已初始化
+            self.share_session = self._get_config('onnx_session_mode') == 'shared'  # 是否所有线程共用一个会话
+            self.session_options = self._create_session_options()
             self.session_last_used = {}  # 记录每个会话最后使用时间
             
+            # 持久化结果存储：以原始响应内容摘要为键，重启后仍可在解码前命中；
+            # 模型、阈值或预分类配置变化后已保存的结果全部作废
+            self.verdict_store = None
+            if self._get_config('enable_verdict_store') == '1':
+                self.verdict_store = PersistentVerdictStore(
+                    self.db,
+                    self.logger,
+                    self._get_config('verdict_store_ttl_days', int) * 86400,
+                    self._get_config('verdict_store_max_entries', int),
+                    self._verdict_fingerprint()
+                )
+            
             # 优化1-1: 启动内存监控线程
-            self.request_count = 0  # 请求计数器，用于基于请求量的清理检查
-            self.last_cleanup_time = 0  # 上次清理时间
+            self.memory_monitor = MemoryPressureMonitor(self._get_config('memory_pressure_percent', float))
+            self.memory_check_interval = self._get_config('memory_check_interval', float)  # 内存压力检查间隔（秒）
             self._start_resource_monitor()
             
             if self.enable_batch_processing:
@@ -58,42 +273,37 @@ class ImagePredictor:
         monitor_thread.start()
         
     def _resource_monitor(self):
-        """综合资源监控线程"""
+        """综合资源监控线程
+        
+        高频轮询低开销的内存压力信号，压力持续期间每次只淘汰一小部分缓存，
+        避免整体清空缓存后大量图片重新推理。
+        """
+        last_stats_time = time.time()
         while True:
-            time.sleep(300)  # 每5分钟检查一次
+            time.sleep(self.memory_check_interval)
             
-            # 检查内存使用
-            memory_percent = psutil.virtual_memory().percent
-            current_time = time.time()
+            if self.memory_monitor.under_pressure():
+                self._perform_cleanup()
             
-            # 只有距离上次清理超过30秒才执行
-            if current_time - self.last_cleanup_time > 30:
-                if memory_percent > 75:
-                    self._perform_cleanup(memory_percent, "定时检查")
-                    self.last_cleanup_time = current_time
+            # 每5分钟输出一次肤色预分类的放行率和批处理的延迟目标达成情况
+            if time.time() - last_stats_time > 300:
+                last_stats_time = time.time()
+                if self.skin_filter is not None:
+                    checked_count, pass_rate = self.skin_filter.pass_rate()
+                    self.logger.info(I18n.get("skin_filter_stats", checked_count, pass_rate))
+                slo_miss_count, per_image_cost = self.batch_scheduler.stats()
+                if self.enable_batch_processing and per_image_cost is not None:
+                    self.logger.info(I18n.get("batch_slo_stats", slo_miss_count,
+                                              self.batch_scheduler.latency_slo * 1000, per_image_cost * 1000))
     
-    def _perform_cleanup(self, memory_percent, trigger_source):
-        """统一的资源清理方法
-        
-        Args:
-            memory_percent: 当前内存使用百分比
-            trigger_source: 触发清理的来源（"定时检查"或"请求量检查"）
-        """
-        if memory_percent > 85:  # 内存压力非常大
-            # 清理所有缓存
-            with self.cache_lock:
-                self.image_cache.clear()
-            # 清理不活跃会话
-            self._cleanup_inactive_sessions()
-            self.logger.info(I18n.get("memory_high_cleanup", memory_percent, trigger_source))
-        elif memory_percent > 75:  # 内存压力较大
-            # 清理部分缓存
-            with self.cache_lock:
-                items_to_remove = len(self.image_cache) // 4  # 统一为清理25%
-                for _ in range(items_to_remove):
-                    if self.image_cache:
-                        self.image_cache.popitem(last=False)
-            self.logger.info(I18n.get("memory_medium_cleanup", memory_percent, trigger_source))
+    def _perform_cleanup(self):
+        """内存压力下的资源清理：按比例淘汰各级缓存中最久未使用的项，并释放不活跃会话"""
+        freed_bytes = self.image_cache.shrink(CACHE_TRIM_FRACTION)
+        freed_bytes += self.content_cache.shrink(CACHE_TRIM_FRACTION)
+        freed_bytes += self.validator_cache.shrink(CACHE_TRIM_FRACTION)
+        freed_phashes = self.phash_index.shrink(CACHE_TRIM_FRACTION) if self.phash_index is not None else 0
+        self._cleanup_inactive_sessions()
+        self.logger.info(I18n.get("memory_pressure_trim", freed_bytes // 1024, freed_phashes))
     
     def _cleanup_inactive_sessions(self):
         """清理长时间不活跃的会话"""
@@ -113,6 +323,10 @@ class ImagePredictor:
                     del self.session_last_used[thread_id]
                     self.logger.info(I18n.get("inactive_session_released", thread_id))
 
+    def _get_config(self, key, converter=str):
+        """读取检测相关配置，见 config_rules.read_config"""
+        return read_config(self.db, self.logger, key, converter)
+
     def _get_batch_config(self):
         """从数据库读取批处理配置"""
         try:
@@ -156,60 +370,140 @@ class ImagePredictor:
         """启动批处理处理器线程"""
         def batch_processor():
             while True:
-                batch_items = []
+                batch_items = []  # 批次内的 PreparedImage
                 batch_futures = []
+                batch_waits = []
                 try:
-                    # 收集一批图像
-                    while len(batch_items) < self.batch_size:
+                    # 阻塞等待第一张图像，空闲时不产生额外延迟
+                    try:
+                        _, _, item = self.batch_queue.get(timeout=1)
+                    except Empty:
+                        continue
+                    batch_items.append(item['prepared'])
+                    batch_futures.append(item['future'])
+                    batch_waits.append(time.time() - item['enqueue_time'])
+                    
+                    # 根据队首等待时间和推理耗时确定批次大小，队列取空后立即执行
+                    limit = self.batch_scheduler.batch_limit(batch_waits[0])
+                    while len(batch_items) < limit:
                         try:
-                            item = self.batch_queue.get(timeout=self.batch_timeout)
-                            batch_items.append(item['img_array'])
-                            batch_futures.append(item['future'])
-                        except:  # 超时
+                            _, _, item = self.batch_queue.get_nowait()
+                        except Empty:
                             break
+                        batch_items.append(item['prepared'])
+                        batch_futures.append(item['future'])
+                        batch_waits.append(time.time() - item['enqueue_time'])
                     
-                    if not batch_items:  # 没有收集到任何图像
-                        continue
-                    
-                    # 处理收集到的批次
-                    if batch_items:
-                        # 将图像数组堆叠成批次
-                        batch_array = np.stack(batch_items)
-                        # 进行批量预测
-                        predictions = self._predict_batch(batch_array)
-                        # 分发结果
-                        for i, future in enumerate(batch_futures):
-                            result = predictions[i][1] > IMAGE_THRESHOLD or \
-                                    predictions[i][3] > IMAGE_THRESHOLD or \
-                                    predictions[i][4] > IMAGE_THRESHOLD
-                            future.set_result((predictions[i], result))
+                    # 输入位于同一张量环时按槽位取批次，连续槽位直接使用视图；
+                    # 否则逐张复制到预分配的批次缓冲区
+                    ring = batch_items[0].ring
+                    if all(prepared.ring is ring for prepared in batch_items):
+                        batch_array = ring.gather([prepared.slot for prepared in batch_items], self.batch_buffer)
+                    else:
+                        batch_array = self.batch_buffer[:len(batch_items)]
+                        for i, prepared in enumerate(batch_items):
+                            batch_array[i] = prepared.tensor
+                    # 进行批量预测
+                    start_time = time.perf_counter()
+                    result = self._predict_batch(batch_array)
+                    self.batch_scheduler.record(len(batch_items), time.perf_counter() - start_time, batch_waits)
+                    # 分发结果
+                    for index, future in enumerate(batch_futures):
+                        future.set_result((result, index))
                 except Exception as e:
                     self.logger.exception(I18n.get("batch_processing_error", str(e)))
                     # 如果发生错误，为所有等待的future设置异常
                     for future in batch_futures:
                         if not future.done():
                             future.set_exception(e)
+                finally:
+                    # 推理完成后释放张量环槽位
+                    for prepared in batch_items:
+                        prepared.release()
         
         # 启动批处理线程
         batch_thread = threading.Thread(target=batch_processor, daemon=True)
         batch_thread.start()
 
     def _predict_batch(self, batch_array):
-        """执行批量预测"""
+        """执行批量预测
+        
+        Returns:
+            PredictionResult: 各图片的分数和判定结果
+        """
         session = self.get_session()
         input_name = session.get_inputs()[0].name
         output_name = session.get_outputs()[0].name
         predictions = session.run([output_name], {input_name: batch_array})[0]
-        return predictions
+        return PredictionResult(predictions, self.label_thresholds)
+
+    def _select_model_path(self):
+        """选择模型文件
+        
+        配置为具体变体时直接使用；auto 模式下按速度优先选择已存在的变体，
+        量化和优化模型需先通过 model_tools.py check 的精度回退检查后再发布
+        """
+        variant = self._get_config('image_model_variant')
+        if variant in IMAGE_MODEL_VARIANTS:
+            return IMAGE_MODEL_VARIANTS[variant]
+        for name in IMAGE_MODEL_PREFERENCE:
+            if os.path.exists(IMAGE_MODEL_VARIANTS[name]):
+                self.logger.info(I18n.get("model_variant_selected", name))
+                return IMAGE_MODEL_VARIANTS[name]
+        return IMAGE_MODEL_FILE
+
+    def _verdict_fingerprint(self):
+        """影响检测结果的模型和配置的指纹，用于判断持久化结果是否仍然有效"""
+        try:
+            model_stat = os.stat(self.model_path)
+            model_id = (os.path.basename(self.model_path), model_stat.st_size, model_stat.st_mtime_ns)
+        except OSError:
+            model_id = (os.path.basename(self.model_path),)
+        skin_config = None
+        if self.skin_filter is not None:
+            skin_config = (self.skin_filter.max_skin_ratio, self.skin_filter.flat_coverage, self.skin_filter.flat_max_skin_ratio)
+        phash_config = None
+        if self.phash_index is not None:
+            phash_config = self.phash_index.max_distance
+        gif_config = (GIF_SAMPLER_VERSION, self.gif_sample_strategy, self.gif_max_frames, self.gif_frame_stride,
+                      self.gif_scene_threshold)
+        fingerprint = (model_id, self.label_thresholds.tolist(), skin_config, phash_config, gif_config)
+        return hashlib.md5(repr(fingerprint).encode()).hexdigest()
+
+    def _create_session_options(self):
+        """根据配置创建 ONNX Runtime 会话选项"""
+        options = ort.SessionOptions()
+        # 0 表示由 ONNX Runtime 自动决定线程数
+        options.intra_op_num_threads = self._get_config('onnx_intra_op_threads', int)
+        options.inter_op_num_threads = self._get_config('onnx_inter_op_threads', int)
+        options.execution_mode = EXECUTION_MODES.get(
+            self._get_config('onnx_execution_mode'), ort.ExecutionMode.ORT_SEQUENTIAL
+        )
+        options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS.get(
+            self._get_config('onnx_graph_optimization'), ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        options.enable_cpu_mem_arena = self._get_config('onnx_enable_mem_arena') == '1'
+        return options
 
     def get_session(self):
-        """为每个线程获取独立的 ONNX 会话，实现懒加载"""
-        thread_id = threading.get_ident()
+        """获取 ONNX 会话，实现懒加载
+        
+        per_thread 模式下每个线程使用独立会话；shared 模式下所有线程共用一个会话
+        (InferenceSession.run 是线程安全的)，只加载一份模型权重和一个线程池。
+        per_thread 模式下帧通道的线程共用一个会话，会话数量不超过 max_workers + 1。
+        """
+        if self.share_session:
+            thread_id = SHARED_SESSION_KEY
+        elif threading.current_thread().name.startswith(FRAME_THREAD_PREFIX):
+            thread_id = FRAME_SESSION_KEY
+        else:
+            thread_id = threading.get_ident()
         with self.session_lock:
             if thread_id not in self.sessions:
                 # 延迟加载模型
                 self.sessions[thread_id] = ort.InferenceSession(
                     self.model_path,
+                    sess_options=self.session_options,
                     providers=['CPUExecutionProvider']
                 )
                 
@@ -224,161 +518,306 @@ class ImagePredictor:
     
     def _warm_up_model(self, session):
         """模型预热，避免首次推理的性能损失"""
-        dummy_input = np.random.rand(1, 224, 224, 3).astype(np.float32)
+        dummy_input = np.random.rand(1, *IMAGE_INPUT_SIZE, 3).astype(np.float32)
         input_name = session.get_inputs()[0].name
         output_name = session.get_outputs()[0].name
         session.run([output_name], {input_name: dummy_input})
 
     def _compute_image_hash(self, img_array):
         """计算图像的哈希值，用于缓存查找"""
-        return hashlib.md5(img_array.tobytes()).hexdigest()
+        return compute_image_hash(img_array)
     
     def _check_cache(self, img_hash):
-        """检查图像是否在缓存中，并返回缓存的结果。如果命中，将该项移到最近使用的位置"""
-        with self.cache_lock:
-            if img_hash in self.image_cache:
-                # LRU缓存访问: 移动到最末尾(最近使用的位置)
-                self.image_cache.move_to_end(img_hash)
-                return self.image_cache[img_hash]
-            return None
+        """检查图像是否在缓存中，并返回缓存的结果"""
+        return self.image_cache.get(img_hash)
     
     def _update_cache(self, img_hash, result):
-        """更新LRU缓存，如果缓存太大则移除最久未使用的项"""
-        with self.cache_lock:
-            # 如果缓存已满，移除最久未使用的项(OrderedDict的第一项)
-            if len(self.image_cache) >= self.max_cache_size:
-                try:
-                    # OrderedDict中的第一个项是最久未使用的
-                    self.image_cache.popitem(last=False)
-                except:
-                    # 如果发生错误，清空整个缓存
-                    self.image_cache.clear()
-            # 添加新的缓存项(自动加到OrderedDict的末尾，表示最近使用)
-            self.image_cache[img_hash] = result
-
-    def predict_image(self, img):
+        """更新缓存，超出字节预算时按 CLOCK 顺序淘汰"""
+        self.image_cache.put(img_hash, result)
+
+    def lookup_validator(self, validator_key):
+        """按缓存验证头查找已计算过的内容摘要"""
+        return self.validator_cache.get(validator_key)
+    
+    def remember_validator(self, validator_key, content_digest):
+        """记录缓存验证头对应的内容摘要"""
+        self.validator_cache.put(validator_key, content_digest)
+    
+    def lookup_content(self, content_digest):
+        """按原始响应内容摘要在内存缓存中查找已有的检测结果，无需解码图片
+        
+        Returns:
+            tuple or None: (检测结果, 图片尺寸)，未命中时返回 None
+        """
+        cached = self.content_cache.get(content_digest)
+        if cached is not None:
+            self.logger.info(I18n.get("content_cache_hit", content_digest))
+        return cached
+    
+    def lookup_stored(self, content_digest):
+        """按原始响应内容摘要查找持久化的检测结果，命中时写回内存缓存
+        
+        需要访问数据库，可能等待连接池或写锁，调用方不应在事件循环中直接调用
+        
+        Returns:
+            tuple or None: (检测结果, 图片尺寸)，未启用持久化或未命中时返回 None
+        """
+        if self.verdict_store is None:
+            return None
+        cached = self.verdict_store.get(content_digest)
+        if cached is not None:
+            self.content_cache.put(content_digest, cached)
+            self.logger.info(I18n.get("content_cache_hit", content_digest))
+        return cached
+    
+    def _store_verdict(self, content_digest, result, size):
+        """将检测结果按原始内容摘要缓存并持久化"""
+        if content_digest is None:
+            return
+        self.content_cache.put(content_digest, (result, size))
+        if self.verdict_store is not None:
+            self.verdict_store.put(content_digest, result, size)
+
+    def _lookup_caches(self, img_hash, original_size, content_digest, img_array=None, phash=None):
+        """依次查找精确缓存和感知哈希缓存，命中时同步写入内容缓存
+        
+        Args:
+            img_array: 缩放后的图像数组，未提供感知哈希时用于计算
+            phash: 已计算好的感知哈希
+        
+        Returns:
+            tuple: (缓存的检测结果或 None, 感知哈希或 None)
+        """
+        cached_result = self._check_cache(img_hash)
+        if cached_result is not None:
+            self.logger.info(I18n.get("cache_hit", img_hash))
+            self._store_verdict(content_digest, cached_result, original_size)
+            return cached_result, phash
+        
+        # 精确缓存未命中，按感知哈希查找相似图片
+        if self.phash_index is None:
+            return None, None
+        if phash is None:
+            phash = compute_phash(img_array)
+        cached_result = self.phash_index.lookup(phash)
+        if cached_result is not None:
+            self.logger.info(I18n.get("phash_cache_hit", f"{phash:016x}"))
+            self._update_cache(img_hash, cached_result)
+            self._store_verdict(content_digest, cached_result, original_size)
+        return cached_result, phash
+
+    def _predict_tensor(self, prepared, content_digest, priority=DEFAULT_PRIORITY):
+        """对张量环槽位中归一化后的张量执行推理，并更新各级缓存
+        
+        Args:
+            prepared: 预处理完成的图像，槽位在推理完成后由本方法或批处理线程释放
+            priority: 批处理队列中的优先级，数值越小越先处理
+        """
+        if self.enable_batch_processing:
+            # 批处理模式
+            future = Future()
+            self.batch_queue.put((priority, next(self.batch_counter), {
+                'prepared': prepared,
+                'future': future,
+                'enqueue_time': time.time()
+            }))
+            try:
+                # 将超时时间从5秒增加到60秒
+                prediction, index = future.result(timeout=60)
+            except TimeoutError:
+                # 超时时记录日志并返回屏蔽结果，但不加入缓存
+                self.logger.warning(I18n.get("image_processing_timeout", prepared.img_hash))
+                return True  # 安全起见，将超时图像视为有害
+        else:
+            # 单张处理模式
+            try:
+                prediction = self._predict_batch(prepared.tensor[np.newaxis])
+            finally:
+                prepared.release()
+            index = 0
+
+        result = prediction.blocked[index]
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(I18n.get("predict_result", prediction.label_scores(index), result))
+        self._remember_result(prepared.img_hash, prepared.phash, content_digest, result, prepared.original_size)
+        return result
+
+    def _remember_result(self, img_hash, phash, content_digest, result, original_size):
+        """将检测结果写入各级缓存"""
+        self._update_cache(img_hash, result)
+        if phash is not None and self.phash_index is not None:
+            self.phash_index.add(phash, result)
+        self._store_verdict(content_digest, result, original_size)
+
+    def _handle_predict_error(self, e):
+        """处理预测过程中的异常"""
+        error_msg = str(e)
+        # 如果是模型文件不存在的错误，返回 True
+        if "NO_SUCHFILE" in error_msg and "File doesn't exist" in error_msg:
+            return "No Module File"
+        self.logger.info(I18n.get("ONNX_runtime_error", error_msg))
+        return False
+
+    def predict_image(self, img, content_digest=None, priority=DEFAULT_PRIORITY):
         try:
-            # 增加请求计数
-            self.request_count += 1
-            
-            # 每处理100个请求检查一次内存，但确保距离上次清理至少间隔30秒
-            current_time = time.time()
-            if self.request_count % 100 == 0 and current_time - self.last_cleanup_time > 30:
-                memory_percent = psutil.virtual_memory().percent
-                if memory_percent > 75:
-                    self._perform_cleanup(memory_percent, "请求量检查")
-                    self.last_cleanup_time = current_time
-            
             # 如果是 GIF，进行逐帧检测
             if getattr(img, 'is_animated', False):
-                return self._predict_gif(img)
+                result = self._predict_gif(img, priority)
+                if result is None:
+                    return False  # 抽帧出错时放行，但不缓存结果
+                # 动图的解码和抽帧代价最高，结果按原始内容摘要缓存并持久化
+                self._store_verdict(content_digest, result, img.size)
+                return result
             
-            # 调整图像大小并预处理
-            img = img.resize((224, 224))  # 调整图像尺寸为 224x224
-            img_array = np.array(img)  # 转换为数组
+            # 记录原始尺寸，调整图像大小并预处理
+            original_size = img.size
+            img_array = to_rgb_array(resize_for_model(img))  # 调整图像尺寸为 224x224
             
-            # 如果图像不是 RGB 格式，则将其转换为 RGB
-            if img_array.shape[-1] != 3:
-                img = img.convert('RGB')
-                img_array = np.array(img)
-            
-            # 计算图像哈希值
+            # 计算图像哈希值并检查缓存
             img_hash = self._compute_image_hash(img_array)
-            
-            # 检查缓存
-            cached_result = self._check_cache(img_hash)
+            cached_result, phash = self._lookup_caches(img_hash, original_size, content_digest, img_array=img_array)
             if cached_result is not None:
-                self.logger.info(I18n.get("cache_hit", img_hash))
                 return cached_result
             
-            # 缓存未命中，继续处理
-            img_array = img_array.astype(np.float32) / 255.0  # 归一化
-            
-            if self.enable_batch_processing:
-                # 批处理模式
-                future = Future()
-                self.batch_queue.put({
-                    'img_array': img_array,
-                    'future': future
-                })
-                try:
-                    # 将超时时间从5秒增加到60秒
-                    predictions, result = future.result(timeout=60)
-                except TimeoutError:
-                    # 超时时记录日志并返回屏蔽结果，但不加入缓存
-                    self.logger.warning(I18n.get("image_processing_timeout", img_hash))
-                    return True  # 安全起见，将超时图像视为有害
-            else:
-                # 单张处理模式
-                session = self.get_session()
-                input_name = session.get_inputs()[0].name
-                output_name = session.get_outputs()[0].name
-                predictions = session.run([output_name], {input_name: img_array.reshape(1, 224, 224, 3)})[0][0]
-                result = predictions[1] > IMAGE_THRESHOLD or \
-                        predictions[3] > IMAGE_THRESHOLD or \
-                        predictions[4] > IMAGE_THRESHOLD
-
-            self.logger.info(I18n.get("predict_result", predictions, result))
-            
-            # 更新缓存
-            self._update_cache(img_hash, result)
+            # 肤色预分类：明显安全的图片不经模型直接放行
+            if self.skin_filter is not None and self.skin_filter.is_clearly_safe(compute_skin_features(img_array)):
+                self._remember_result(img_hash, phash, content_digest, False, original_size)
+                return False
             
-            return result
+            # 缓存未命中，归一化结果直接写入张量环槽位后推理
+            slot = self.tensor_ring.acquire()
+            normalize_into(img_array, self.tensor_ring.tensors[slot])
+            prepared = PreparedImage(self.tensor_ring, slot, img_hash, phash, original_size)
+            return self._predict_tensor(prepared, content_digest, priority)
             
         except Exception as e:
-            error_msg = str(e)
-            # 如果是模型文件不存在的错误，返回 True
-            if "NO_SUCHFILE" in error_msg and "File doesn't exist" in error_msg:
-                return "No Module File"
-            self.logger.info(I18n.get("ONNX_runtime_error", error_msg))
-            return False
+            return self._handle_predict_error(e)
 
-    def _predict_gif(self, gif_img):
-        """并行处理GIF图像的所有帧"""
+    def predict_bytes(self, image_data, content_digest=None, priority=DEFAULT_PRIORITY):
+        """在预处理进程池中完成解码、缩放和归一化，再在本进程执行推理"""
         try:
-            n_frames = gif_img.n_frames
-            frames = []
-            
-            # 收集所有帧
-            for frame_idx in range(n_frames):
-                gif_img.seek(frame_idx)
-                # 转换当前帧为RGB
-                frames.append(gif_img.convert('RGB'))
-            
-            # 优化2: 并行处理所有帧
-            futures = []
-            for frame in frames:
-                # 提交每一帧到线程池进行处理
-                futures.append(self.executor.submit(self.predict_image, frame))
+            prepared = self.preprocess_pool.preprocess(image_data, self.skin_filter is not None)
+            try:
+                cached_result, phash = self._lookup_caches(
+                    prepared.img_hash, prepared.original_size, content_digest, phash=prepared.phash
+                )
+            except Exception:
+                prepared.release()
+                raise
+            if cached_result is not None:
+                prepared.release()
+                return cached_result
+            if self.skin_filter is not None and self.skin_filter.is_clearly_safe(prepared.skin_features):
+                prepared.release()
+                self._remember_result(prepared.img_hash, phash, content_digest, False, prepared.original_size)
+                return False
+            # 张量留在共享内存槽位中直接推理，槽位交由推理流程释放
+            return self._predict_tensor(prepared, content_digest, priority)
+        except Exception as e:
+            return self._handle_predict_error(e)
+
+    def _sample_gif_frames(self, gif_img):
+        """按配置的抽帧策略惰性生成动图中需要检测的帧，策略说明见 sample_gif_frames"""
+        for _, frame in sample_gif_frames(gif_img, self.gif_sample_strategy, self.gif_max_frames,
+                                          self.gif_frame_stride, self.gif_scene_threshold):
+            yield frame
+
+    def _is_blocked(self, result):
+        """判断检测结果是否为不适当内容"""
+        return bool(result) and result != "No Module File"
+
+    def _submit_frame(self, frame, priority):
+        """将帧提交到帧通道，通道已满时返回 None"""
+        if not self.frame_slots.acquire(blocking=False):
+            return None
+        future = self.frame_executor.submit(self.predict_image, frame, None, priority)
+        # 任务完成或被取消时归还通道名额
+        future.add_done_callback(lambda _: self.frame_slots.release())
+        return future
+
+    def _collect_finished_frames(self, pending):
+        """从 pending 中移除已完成的帧任务，返回其中是否有不适当的帧"""
+        blocked = False
+        unfinished = []
+        for future, frame in pending:
+            if future.done():
+                blocked = blocked or self._is_blocked(future.result())
+            else:
+                unfinished.append((future, frame))
+        pending[:] = unfinished
+        return blocked
+
+    def _predict_gif(self, gif_img, priority=DEFAULT_PRIORITY):
+        """按抽帧策略处理GIF图像，任意一帧不适当即提前结束
+        
+        帧任务在独立的帧通道中执行，不会与图片任务争用 self.executor 的工作线程；
+        帧通道已满或帧任务尚未开始时由当前任务直接执行，父任务不会空等自己的子任务。
+        
+        Returns:
+            bool or None: 是否有不适当的帧，处理出错时返回 None
+        """
+        # 尚未完成的 (future, frame)，已完成的帧任务及时移除，不再持有其帧数据；
+        # 帧通道名额有限，因此同时持有的帧数量有上限
+        pending = []
+        try:
+            for frame in self._sample_gif_frames(gif_img):
+                # 已完成的帧中有不适当内容时不再继续抽帧
+                if self._collect_finished_frames(pending):
+                    return True
+                future = self._submit_frame(frame, priority)
+                if future is not None:
+                    pending.append((future, frame))
+                elif self._is_blocked(self.predict_image(frame, None, priority)):
+                    return True
             
-            # 等待所有帧处理完成
-            for future in futures:
+            # 按提交顺序等待剩余的帧，处理完的帧随即释放
+            while pending:
+                future, frame = pending.pop(0)
+                if future.cancel():
+                    # 帧任务尚未开始，由当前任务直接执行
+                    result = self.predict_image(frame, None, priority)
+                else:
+                    result = future.result()
                 # 一旦有任何一帧被检测为不适当内容，立即返回True
-                result = future.result()
-                if result is True:
-                    # 取消所有其它尚未完成的任务
-                    for f in futures:
-                        if not f.done():
-                            f.cancel()
+                if self._is_blocked(result):
                     return True
             
             # 所有帧都通过检查
             return False
         except Exception as e:
             self.logger.info(I18n.get("GIF_PROCESS_ERROR", str(e)))
-            return False
+            return None
+        finally:
+            # 取消所有其它尚未完成的任务
+            for f, _ in pending:
+                if not f.done():
+                    f.cancel()
+
+    def predict_async(self, img, content_digest=None, priority=DEFAULT_PRIORITY):
+        """异步处理图像，priority 越小越先处理"""
+        return self.executor.submit(priority, self.predict_image, img, content_digest, priority)
 
-    def predict_async(self, img):
-        """异步处理图像"""
-        return self.executor.submit(self.predict_image, img)
+    def predict_bytes_async(self, image_data, content_digest=None, priority=DEFAULT_PRIORITY):
+        """异步处理原始图片数据，解码在预处理进程池中完成"""
+        return self.executor.submit(priority, self.predict_bytes, image_data, content_digest, priority)
 
     def cleanup(self):
         """清理资源"""
         self.executor.shutdown(wait=True)
+        self.frame_executor.shutdown(wait=True)
+        if self.preprocess_pool is not None:
+            self.preprocess_pool.shutdown()
         self.sessions.clear()
+        # 写入尚未提交的检测结果
+        if self.verdict_store is not None:
+            self.verdict_store.flush()
+        self.memory_monitor.close()
         # 清理缓存
-        with self.cache_lock:
-            self.image_cache.clear()
+        self.image_cache.clear()
+        if self.phash_index is not None:
+            self.phash_index.clear()
+        self.content_cache.clear()
+        self.validator_cache.clear()
         # 清空批处理队列
         while not self.batch_queue.empty():
             try:
@@ -0,0 +1,136 @@
+from i18n import I18n
+from constants import IMAGE_LABELS, IMAGE_MODEL_VARIANTS, DEFAULT_CONFIG
+
+# 检测相关配置项的取值规则，可通过 proxy_config 的 tune 命令修改
+# 数值规则为 (类型, 最小值, 最大值)；枚举规则为 ('choice', 可选值)；开关为 ('flag',)；
+# 搜索词参数表为 ('search_params',)
+FLAG = ('flag',)
+SEARCH_PARAMS = ('search_params',)
+CONFIG_RULES = {
+    "batch_max_size": (int, 1, 256),
+    "batch_latency_slo_ms": (int, 1, 10000),
+    "enable_phash_cache": FLAG,
+    "phash_max_distance": (int, 0, 16),
+    "phash_cache_size": (int, 1, 1000000),
+    "image_cache_budget_kb": (int, 1, 1048576),
+    "content_cache_budget_kb": (int, 1, 1048576),
+    "cache_shard_count": (int, 1, 256),
+    "title_scan_kb": (int, 1, 4096),
+    "title_check_meta": FLAG,
+    "search_query_params": SEARCH_PARAMS,
+    "enable_text_model": FLAG,
+    "text_model_max_tokens": (int, 3, 512),
+    "text_batch_size": (int, 1, 256),
+    "text_batch_wait_ms": (float, 0, 1000),
+    "text_latency_budget_ms": (float, 1, 10000),
+    "text_model_threshold": (float, 0, 1),
+    "text_cache_budget_kb": (int, 1, 1048576),
+    "text_model_threads": (int, 0, 64),
+    "memory_pressure_percent": (float, 1, 100),
+    "memory_check_interval": (float, 0.1, 3600),
+    "enable_verdict_store": FLAG,
+    "verdict_store_ttl_days": (int, 1, 365),
+    "verdict_store_max_entries": (int, 1, 100000000),
+    "inference_backend": ('choice', ('thread', 'process')),
+    "preprocess_workers": (int, 0, 64),
+    "tensor_ring_slots": (int, 1, 1024),
+    "onnx_session_mode": ('choice', ('per_thread', 'shared')),
+    "onnx_intra_op_threads": (int, 0, 64),
+    "onnx_inter_op_threads": (int, 0, 64),
+    "onnx_execution_mode": ('choice', ('sequential', 'parallel')),
+    "onnx_graph_optimization": ('choice', ('disable', 'basic', 'extended', 'all')),
+    "onnx_enable_mem_arena": FLAG,
+    "image_model_variant": ('choice', ('auto', *IMAGE_MODEL_VARIANTS)),
+    "gif_sample_strategy": ('choice', ('all', 'uniform', 'scene')),
+    "gif_max_frames": (int, 1, 1000),
+    "gif_frame_stride": (int, 1, 1000),
+    "gif_scene_threshold": (float, 0, 255),
+    "prefilter_min_side": (int, 0, 10000),
+    "prefilter_min_pixels": (int, 0, 100000000),
+    "prefilter_min_bytes": (int, 0, 100000000),
+    "enable_skin_filter": FLAG,
+    "skin_filter_max_ratio": (float, 0, 1),
+    "skin_filter_flat_coverage": (float, 0, 1),
+    "skin_filter_flat_max_ratio": (float, 0, 1),
+    **{f"image_threshold_{label}": (float, 0, 1) for label in IMAGE_LABELS},
+}
+
+def describe_rule(key):
+    """返回配置项取值范围的说明文字"""
+    rule = CONFIG_RULES[key]
+    if rule == FLAG:
+        return "0 | 1"
+    if rule[0] == 'choice':
+        return " | ".join(rule[1])
+    if rule == SEARCH_PARAMS:
+        return "host:param[,param][;host:...]"
+    converter, minimum, maximum = rule
+    return f"{converter.__name__} {minimum} ~ {maximum}"
+
+def validate_config_value(key, value):
+    """校验配置值是否符合取值规则
+
+    Returns:
+        str: 去除首尾空白后的配置值
+
+    Raises:
+        KeyError: 配置项不在 CONFIG_RULES 中
+        ValueError: 配置值不符合取值规则
+    """
+    rule = CONFIG_RULES[key]
+    value = str(value).strip()
+    if rule == FLAG:
+        if value not in ('0', '1'):
+            raise ValueError(value)
+        return value
+    if rule[0] == 'choice':
+        if value not in rule[1]:
+            raise ValueError(value)
+        return value
+    if rule == SEARCH_PARAMS:
+        parse_search_params(value)
+        return value
+    converter, minimum, maximum = rule
+    if not minimum <= converter(value) <= maximum:
+        raise ValueError(value)
+    return value
+
+def parse_search_params(value):
+    """解析 search_query_params 配置
+
+    格式为 "域名:参数,参数;域名:参数"，参数为空的域名（如 "example.com:"）不再检查搜索词。
+
+    Returns:
+        dict: 域名 -> 搜索词参数元组
+
+    Raises:
+        ValueError: 格式不正确
+    """
+    overrides = {}
+    for entry in value.split(';'):
+        if not entry.strip():
+            continue
+        host, separator, params = entry.partition(':')
+        host = host.strip().lower()
+        if not separator or not host or any(char.isspace() for char in host):
+            raise ValueError(entry)
+        params = tuple(param.strip() for param in params.split(',') if param.strip())
+        if any(any(char.isspace() or char in '&=' for char in param) for param in params):
+            raise ValueError(entry)
+        overrides[host] = params
+    return overrides
+
+def read_config(db, logger, key, converter=str):
+    """从数据库读取并按 CONFIG_RULES 校验配置
+
+    不存在时写入 DEFAULT_CONFIG 中的默认值；读取失败或不合法时记录日志并使用默认值。
+    """
+    default = DEFAULT_CONFIG[key]
+    try:
+        value = db.get_config_or_default(key, default)
+        if key in CONFIG_RULES:
+            value = validate_config_value(key, value)
+        return converter(value)
+    except Exception as e:
+        logger.exception(I18n.get("config_read_error", key, str(e)))
+        return converter(default)
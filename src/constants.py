@@ -54,7 +54,57 @@ ICON_PATH = os.path.join(BASE_DIR, "icon.ico")
 DEFAULT_CONFIG = {"proxy_port": "51949", 
                   "socket_port": "51001", 
                   "upstream_enable": "0", 
-                  "enable_batch_processing": "0"}
+                  "enable_batch_processing": "0",
+                  "batch_max_size": "32",
+                  "batch_latency_slo_ms": "100",
+                  "enable_phash_cache": "0",
+                  "phash_max_distance": "4",
+                  "phash_cache_size": "5000",
+                  "image_cache_budget_kb": "1024",
+                  "content_cache_budget_kb": "4096",
+                  "cache_shard_count": "8",
+                  "title_scan_kb": "64",
+                  "title_check_meta": "0",
+                  "search_query_params": "",
+                  "enable_text_model": "0",
+                  "text_model_max_tokens": "64",
+                  "text_batch_size": "16",
+                  "text_batch_wait_ms": "5",
+                  "text_latency_budget_ms": "50",
+                  "text_model_threshold": "0.8",
+                  "text_cache_budget_kb": "512",
+                  "text_model_threads": "1",
+                  "memory_pressure_percent": "80",
+                  "memory_check_interval": "5",
+                  "enable_verdict_store": "1",
+                  "verdict_store_ttl_days": "7",
+                  "verdict_store_max_entries": "100000",
+                  "inference_backend": "thread",
+                  "preprocess_workers": "0",
+                  "tensor_ring_slots": "32",
+                  "onnx_session_mode": "per_thread",
+                  "onnx_intra_op_threads": "0",
+                  "onnx_inter_op_threads": "0",
+                  "onnx_execution_mode": "sequential",
+                  "onnx_graph_optimization": "all",
+                  "onnx_enable_mem_arena": "1",
+                  "image_model_variant": "auto",
+                  "gif_sample_strategy": "scene",
+                  "gif_max_frames": "16",
+                  "gif_frame_stride": "1",
+                  "gif_scene_threshold": "12",
+                  "prefilter_min_side": "32",
+                  "prefilter_min_pixels": "1024",
+                  "prefilter_min_bytes": "128",
+                  "enable_skin_filter": "0",
+                  "skin_filter_max_ratio": "0.02",
+                  "skin_filter_flat_coverage": "0.8",
+                  "skin_filter_flat_max_ratio": "0.1",
+                  "image_threshold_drawings": "1",
+                  "image_threshold_hentai": "0.3",
+                  "image_threshold_neutral": "1",
+                  "image_threshold_porn": "0.3",
+                  "image_threshold_sexy": "0.3"}
 
 # 注册表子键
 INTERNET_SUB_KEY = ["ProxyEnable", "ProxyServer"]
@@ -65,12 +115,21 @@ LOG_PATH = os.path.join(BASE_DIR, 'log')
 DATABASE_PATH = os.path.join(BASE_DIR, 'purity.db')
 # 模型路径
 MODEL_DIR = os.path.join(BASE_DIR, 'model')
-# TEXT_MODEL_FILE = os.path.join(MODEL_DIR, 'ernie-3.0-mini-zh.onnx')
-# TOKENIZER_DIR = os.path.join(MODEL_DIR, 'tokenizer')
+TEXT_MODEL_FILE = os.path.join(MODEL_DIR, 'ernie-3.0-mini-zh.onnx')
+TOKENIZER_DIR = os.path.join(MODEL_DIR, 'tokenizer')
+TEXT_VOCAB_FILE = os.path.join(TOKENIZER_DIR, 'vocab.txt')
 
 IMAGE_MODEL_FILE = os.path.join(MODEL_DIR, 'mobilenet_v2.onnx')
+# 模型变体：INT8 量化模型、离线图优化模型和原始 FP32 模型
+IMAGE_MODEL_VARIANTS = {
+    'int8': os.path.join(MODEL_DIR, 'mobilenet_v2.int8.onnx'),
+    'optimized': os.path.join(MODEL_DIR, 'mobilenet_v2.opt.onnx'),
+    'fp32': IMAGE_MODEL_FILE,
+}
+IMAGE_MODEL_PREFERENCE = ['int8', 'optimized', 'fp32']  # 自动选择时按推理速度从快到慢的顺序
 IMAGE_LABELS = ['drawings', 'hentai', 'neutral', 'porn', 'sexy']
-IMAGE_THRESHOLD = 0.3
+IMAGE_INPUT_SIZE = (224, 224)  # 模型输入尺寸
+IMAGE_REDUCING_GAP = 2.0  # 缩放前先做整数倍缩小的比例阈值
 
 TEST_DIR = os.path.join(BASE_DIR, 'test')
 
@@ -88,6 +147,17 @@ SKIP_CONTENT_TYPES = {
 #文本类型
 TEXT_CONTENT_TYPES = {"text/html", "text/plain"}
 
+# 搜索引擎域名 -> 携带搜索词的查询参数，子域名按所属域名匹配
+# 默认值，可通过配置项 search_query_params 按域名覆盖或新增
+SEARCH_QUERY_PARAMS = {
+    'google.com': ('q',), 'google.com.hk': ('q',), 'bing.com': ('q',),
+    'baidu.com': ('wd', 'word', 'kw'), 'sogou.com': ('query', 'keyword'), 'so.com': ('q',),
+    'sm.cn': ('q',), 'yahoo.com': ('p',), 'duckduckgo.com': ('q',),
+    'yandex.com': ('text',), 'yandex.ru': ('text',), 'youtube.com': ('search_query',),
+    'bilibili.com': ('keyword',), 'douyin.com': ('keyword',), 'zhihu.com': ('q',),
+    'weibo.com': ('q',), 'xiaohongshu.com': ('keyword',),
+}
+
 # 图片相关常量
 IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff', '.avif'}
 IMAGE_CONTENT_TYPES = {
@@ -95,6 +165,11 @@ IMAGE_CONTENT_TYPES = {
     'image/webp', 'image/tiff', 'image/avif', 'image/x-icon'
 }
 
+# 图片推理优先级：sec-fetch-dest 对应的基础优先级，数值越小越先处理
+# document 为直接打开的图片，image 为页面中展示的图片，其余为预取等请求
+IMAGE_FETCH_DEST_PRIORITY = {'document': 0, 'image': 1}
+IMAGE_OTHER_DEST_PRIORITY = 2
+
 # 流媒体类型
 STREAMING_TYPES = {
     # 媒体类型
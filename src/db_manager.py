@@ -51,6 +51,17 @@ class DatabaseManager:
                 )
             ''')
 
+            # 图片检测结果持久化缓存，以原始响应内容摘要为键
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS image_verdict (
+                    digest TEXT PRIMARY KEY,
+                    verdict INTEGER NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    created_at REAL NOT NULL
+                )
+            ''')
+
             # 插入默认配置项
             cursor.execute('''
                 INSERT OR IGNORE INTO config (key, value, config_type) VALUES 
@@ -71,6 +82,9 @@ class DatabaseManager:
         
         # 为config表的config_type字段创建索引，提高配置查询效率
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_config_type ON config (config_type)')
+        
+        # 为image_verdict表的created_at字段创建索引，提高过期清理效率
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_image_verdict_created ON image_verdict (created_at)')
     
     def _create_connection(self):
         """创建新的数据库连接"""
@@ -153,6 +167,19 @@ class DatabaseManager:
         finally:
             self.release_connection(connection)
 
+    def execute_many(self, query, params_list):
+        """
+        批量执行参数化语句，在同一事务中提交
+        """
+        connection = self.get_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.executemany(query, params_list)
+            connection.commit()
+            return cursor
+        finally:
+            self.release_connection(connection)
+
     def safe_execute(self, query, params=()):
         """
         安全执行查询，带有重试机制
@@ -209,6 +236,16 @@ class DatabaseManager:
         result = self.fetchone('SELECT value FROM config WHERE key = ?', (key,))
         return result[0] if result else None
     
+    def get_config_or_default(self, key, default):
+        """
+        获取配置项的值，如果不存在则写入默认值
+        """
+        result = self.get_config(key)
+        if result is None:
+            self.safe_execute("INSERT OR IGNORE INTO config (key, value, config_type) VALUES (?, ?, '0')", (key, default))
+            return default
+        return result
+    
     def check_type(self, key):
         """
         校验设置类型
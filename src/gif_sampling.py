@@ -0,0 +1,46 @@
+import math
+import numpy as np
+
+# 场景切换抽帧使用的缩略图尺寸和候选帧超采样倍数
+GIF_SCENE_THUMB_SIZE = (32, 32)
+GIF_SCENE_OVERSAMPLE = 4
+
+# 抽帧算法的版本，算法改变时使持久化的动图检测结果失效
+GIF_SAMPLER_VERSION = 2
+
+def sample_gif_frames(gif_img, strategy, max_frames, frame_stride, scene_threshold):
+    """按抽帧策略惰性生成动图中需要检测的帧
+
+    all: 逐帧检测；uniform: 按步长均匀抽帧；scene: 将动画均分为 max_frames 段，
+    每段最多选取一帧，且与上一个选中帧的缩略图平均差异超过阈值时才选取（首帧必选）。
+    uniform 和 scene 最多生成 max_frames 帧，画面持续变化时选中的帧也会分布到动画末尾。
+
+    Yields:
+        tuple: (帧序号, RGB 帧)
+    """
+    n_frames = gif_img.n_frames
+    if strategy == 'uniform':
+        stride = max(frame_stride, math.ceil(n_frames / max_frames))
+    elif strategy == 'scene':
+        # 候选帧按每段 GIF_SCENE_OVERSAMPLE 个超采样
+        stride = max(frame_stride, math.ceil(n_frames / (max_frames * GIF_SCENE_OVERSAMPLE)))
+    else:
+        stride = 1
+
+    last_segment = -1
+    last_thumb = None
+    for frame_idx in range(0, n_frames, stride):
+        if strategy == 'scene':
+            segment = frame_idx * max_frames // n_frames
+            if segment == last_segment:
+                continue
+            gif_img.seek(frame_idx)
+            # 通过小尺寸灰度缩略图的帧差判断画面是否发生明显变化
+            thumb = np.asarray(gif_img.convert('L').resize(GIF_SCENE_THUMB_SIZE), dtype=np.int16)
+            if last_thumb is not None and np.abs(thumb - last_thumb).mean() < scene_threshold:
+                continue
+            last_segment = segment
+            last_thumb = thumb
+        else:
+            gif_img.seek(frame_idx)
+        yield frame_idx, gif_img.convert('RGB')
@@ -0,0 +1,79 @@
+from html.parser import HTMLParser
+
+class _HeadComplete(Exception):
+    """已读取所需的字段，停止解析"""
+
+class PageHead:
+    """从页面 <head> 中提取的文本"""
+    def __init__(self):
+        self.title = None
+        self.description = None  # <meta name="description">
+        self.og_title = None  # <meta property="og:title">
+
+    def texts(self):
+        """返回所有非空的文本，用于敏感词检查"""
+        return [text for text in (self.title, self.og_title, self.description) if text]
+
+class _HeadParser(HTMLParser):
+    """只解析到 <head> 结束的 HTML 解析器
+
+    不构建文档树，读取到 </title> (或需要 meta 时读取到 </head>) 即停止；
+    <head> 中混入的 div 等标签不视为正文开始，只有 <body> 或 </head> 表示 <head> 结束。
+    """
+    def __init__(self, include_meta):
+        super().__init__(convert_charrefs=True)
+        self.include_meta = include_meta
+        self.head = PageHead()
+        self.title_parts = None  # 正在读取 <title> 时收集的文本片段
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title' and self.head.title is None:
+            self.title_parts = []
+        elif tag == 'meta' and self.include_meta:
+            attrs = dict(attrs)
+            name = (attrs.get('name') or attrs.get('property') or '').lower()
+            if name == 'description' and self.head.description is None:
+                self.head.description = (attrs.get('content') or '').strip()
+            elif name == 'og:title' and self.head.og_title is None:
+                self.head.og_title = (attrs.get('content') or '').strip()
+        elif tag == 'body':
+            self._finish_title()
+            raise _HeadComplete()
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._finish_title()
+            if not self.include_meta:
+                raise _HeadComplete()
+        elif tag == 'head':
+            self._finish_title()
+            raise _HeadComplete()
+
+    def handle_data(self, data):
+        if self.title_parts is not None:
+            self.title_parts.append(data)
+
+    def _finish_title(self):
+        if self.title_parts is not None:
+            self.head.title = ''.join(self.title_parts).strip()
+            self.title_parts = None
+
+def parse_head(html_text, include_meta=False):
+    """从 HTML 文本开头提取标题，可选提取 meta 描述和 og:title
+
+    Args:
+        html_text: HTML 文本，调用方只需传入响应体的开头部分
+        include_meta: 是否继续读取到 </head> 以提取 meta 描述和 og:title
+
+    Returns:
+        PageHead: 提取到的文本，未找到的字段为 None
+    """
+    parser = _HeadParser(include_meta)
+    try:
+        parser.feed(html_text)
+        parser.close()
+    except _HeadComplete:
+        pass
+    # 截断在 <title> 中间时保留已读取的部分
+    parser._finish_title()
+    return parser.head
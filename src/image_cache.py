@@ -0,0 +1,367 @@
+import sys
+import time
+import hashlib
+import threading
+import numpy as np
+from i18n import I18n
+from collections import OrderedDict
+
+# 灰度转换权重 (ITU-R BT.601)
+GRAY_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+HASH_BITS = 64
+# 颜色签名中每个通道均值的量化位数
+COLOR_SIGNATURE_BITS = 3
+# 置位数少于该值或多于 HASH_BITS 减该值的 dHash 视为缺少细节（纯色、单向渐变等），不参与近似匹配
+MIN_INFORMATIVE_BITS = 8
+# config 表中保存持久化结果对应的模型和配置指纹的键
+VERDICT_FINGERPRINT_KEY = "verdict_store_fingerprint"
+# 每个缓存项在字典节点、引用等方面的固定开销估计（字节）
+ENTRY_OVERHEAD = 100
+
+def compute_content_digest(data):
+    """计算原始响应内容的摘要，用于在解码前查找检测结果"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def compute_image_hash(img_array):
+    """计算缩放后图像像素的哈希值，用于精确缓存查找"""
+    return hashlib.md5(img_array.tobytes()).hexdigest()
+
+def compute_dhash(img_array):
+    """计算图像的差异哈希(dHash)
+
+    将图像灰度化后按区域均值缩小到 8x9，比较相邻像素的明暗关系得到 64 位哈希。
+    重新编码、轻微压缩或缩放后的同一张图片哈希值只相差少数几位。
+
+    Args:
+        img_array: HxWx3 的图像数组
+
+    Returns:
+        int: 64 位感知哈希值
+    """
+    gray = img_array[..., :3].astype(np.float32) @ GRAY_WEIGHTS
+    height, width = gray.shape
+    row_edges = np.linspace(0, height, 9, dtype=np.intp)
+    col_edges = np.linspace(0, width, 10, dtype=np.intp)
+    # 按区域求和后除以区域面积得到均值
+    sums = np.add.reduceat(np.add.reduceat(gray, row_edges[:-1], axis=0), col_edges[:-1], axis=1)
+    means = sums / np.outer(np.diff(row_edges), np.diff(col_edges))
+    bits = means[:, 1:] > means[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def compute_color_signature(img_array):
+    """计算粗粒度颜色签名：RGB 各通道均值量化到 COLOR_SIGNATURE_BITS 位后拼接"""
+    means = img_array[..., :3].reshape(-1, 3).mean(axis=0).astype(np.uint8) >> (8 - COLOR_SIGNATURE_BITS)
+    signature = 0
+    for value in means:
+        signature = (signature << COLOR_SIGNATURE_BITS) | int(value)
+    return signature
+
+def compute_phash(img_array):
+    """计算用于相似图片缓存的感知哈希
+
+    低 64 位为 dHash，高位为颜色签名。dHash 只反映明暗结构，形状相同但颜色
+    不同的图片必须颜色签名一致才视为相似。
+    """
+    return (compute_color_signature(img_array) << HASH_BITS) | compute_dhash(img_array)
+
+def is_informative_phash(phash):
+    """dHash 部分是否包含足够的明暗变化，纯色和单向渐变的图片不做近似匹配"""
+    bit_count = (phash & ((1 << HASH_BITS) - 1)).bit_count()
+    return MIN_INFORMATIVE_BITS <= bit_count <= HASH_BITS - MIN_INFORMATIVE_BITS
+
+def estimate_size(obj):
+    """估算缓存键或值占用的内存，元组按元素递归累加"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, tuple):
+        size += sum(estimate_size(item) for item in obj)
+    return size
+
+class ClockCache:
+    """按字节预算限制容量的 CLOCK (second-chance) 缓存
+
+    读取只设置缓存项的访问标记，不调整顺序也不加锁；写入和淘汰时持有锁，
+    从最早写入的项开始扫描，被访问过的项清除标记后移到队尾获得第二次机会，
+    未被访问过的项被淘汰。内存紧张时可以按比例逐步淘汰，而不是整体清空。
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes  # 字节预算
+        self.entries = OrderedDict()  # 键 -> [值, 占用字节数, 访问标记]，按写入顺序排列
+        self.total_bytes = 0  # 当前占用字节数
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """获取缓存项，命中时设置访问标记"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        entry[2] = True
+        return entry[0]
+
+    def put(self, key, value):
+        """添加缓存项，超出预算时按 CLOCK 顺序淘汰"""
+        size = estimate_size(key) + estimate_size(value) + ENTRY_OVERHEAD
+        with self.lock:
+            old_entry = self.entries.pop(key, None)
+            if old_entry is not None:
+                self.total_bytes -= old_entry[1]
+            self._evict_to(self.max_bytes - size)
+            self.entries[key] = [value, size, False]
+            self.total_bytes += size
+
+    def shrink(self, fraction):
+        """按 CLOCK 顺序淘汰缓存项，释放约 fraction 比例的占用
+
+        Returns:
+            int: 释放的字节数
+        """
+        with self.lock:
+            before = self.total_bytes
+            self._evict_to(before * (1 - fraction))
+            return before - self.total_bytes
+
+    def _evict_to(self, target_bytes):
+        """淘汰缓存项直到占用不超过 target_bytes，调用方需持有锁
+
+        最多给每个项一次第二次机会，所有项都被访问过时退化为按写入顺序淘汰。
+        """
+        second_chances = len(self.entries)
+        while self.entries and self.total_bytes > target_bytes:
+            key, entry = self.entries.popitem(last=False)
+            if entry[2] and second_chances > 0:
+                second_chances -= 1
+                entry[2] = False
+                self.entries[key] = entry
+                continue
+            self.total_bytes -= entry[1]
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+class ShardedCache:
+    """按键的哈希值分片的 ClockCache
+
+    各分片拥有独立的锁和字节预算，多个检测线程写入不同分片时互不等待。
+    """
+    def __init__(self, max_bytes, shard_count):
+        self.shards = [ClockCache(max_bytes // shard_count) for _ in range(shard_count)]
+
+    def _shard(self, key):
+        return self.shards[hash(key) % len(self.shards)]
+
+    def get(self, key):
+        """获取缓存项"""
+        return self._shard(key).get(key)
+
+    def put(self, key, value):
+        """添加缓存项"""
+        self._shard(key).put(key, value)
+
+    def shrink(self, fraction):
+        """各分片分别释放约 fraction 比例的占用，返回释放的总字节数"""
+        return sum(shard.shrink(fraction) for shard in self.shards)
+
+    def clear(self):
+        """清空缓存"""
+        for shard in self.shards:
+            shard.clear()
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+class PerceptualHashIndex:
+    """基于多索引哈希(Multi-Index Hashing)的感知哈希近邻缓存
+
+    将 64 位哈希切分为 max_distance + 1 段，根据抽屉原理，汉明距离不超过
+    max_distance 的两个哈希至少有一段完全相同，因此只需比较各段命中的候选项。
+    哈希的颜色签名部分必须完全相同；缺少明暗细节的哈希既不查找也不写入。
+    """
+    def __init__(self, max_distance, max_size):
+        self.max_distance = max_distance  # 视为相同图片的最大汉明距离
+        self.max_size = max_size  # 最大缓存项数
+        chunk_count = max_distance + 1
+        bounds = [HASH_BITS * i // chunk_count for i in range(chunk_count + 1)]
+        # 每一段的 (位移, 掩码)
+        self.chunks = [(bounds[i], (1 << (bounds[i + 1] - bounds[i])) - 1) for i in range(chunk_count)]
+        self.entries = OrderedDict()  # 哈希值 -> 检测结果，按最近使用排序
+        self.tables = [{} for _ in range(chunk_count)]  # 段值 -> 哈希值集合
+        self.lock = threading.Lock()
+
+    def lookup(self, phash):
+        """查找颜色签名相同、dHash 汉明距离最近且不超过阈值的缓存项，返回其检测结果"""
+        if not is_informative_phash(phash):
+            return None
+        with self.lock:
+            if phash in self.entries:
+                self.entries.move_to_end(phash)
+                return self.entries[phash]
+            best_hash = None
+            best_distance = self.max_distance + 1
+            for table, (shift, mask) in zip(self.tables, self.chunks):
+                for candidate in table.get((phash >> shift) & mask, ()):
+                    if candidate >> HASH_BITS != phash >> HASH_BITS:
+                        continue
+                    distance = (candidate ^ phash).bit_count()
+                    if distance < best_distance:
+                        best_hash = candidate
+                        best_distance = distance
+            if best_hash is None:
+                return None
+            self.entries.move_to_end(best_hash)
+            return self.entries[best_hash]
+
+    def add(self, phash, result):
+        """添加缓存项，超出容量时移除最久未使用的项"""
+        if not is_informative_phash(phash):
+            return
+        with self.lock:
+            if phash in self.entries:
+                self.entries[phash] = result
+                self.entries.move_to_end(phash)
+                return
+            while len(self.entries) >= self.max_size:
+                oldest, _ = self.entries.popitem(last=False)
+                self._unindex(oldest)
+            self.entries[phash] = result
+            for table, (shift, mask) in zip(self.tables, self.chunks):
+                table.setdefault((phash >> shift) & mask, set()).add(phash)
+
+    def shrink(self, fraction):
+        """淘汰约 fraction 比例的最久未使用的项
+
+        Returns:
+            int: 淘汰的项数
+        """
+        with self.lock:
+            count = int(len(self.entries) * fraction)
+            for _ in range(count):
+                oldest, _ = self.entries.popitem(last=False)
+                self._unindex(oldest)
+            return count
+
+    def _unindex(self, phash):
+        """从各段索引中移除哈希值"""
+        for table, (shift, mask) in zip(self.tables, self.chunks):
+            key = (phash >> shift) & mask
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.discard(phash)
+                if not bucket:
+                    del table[key]
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            self.entries.clear()
+            for table in self.tables:
+                table.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+class PersistentVerdictStore:
+    """持久化的图片检测结果存储
+
+    以原始响应内容摘要为键保存到 purity.db，mitmproxy 重启后仍然有效。
+    写入先进入内存待写队列，由后台线程定期批量提交，避免在请求路径上等待磁盘。
+    保存的结果与生成它的模型和配置指纹绑定，指纹变化时清空已保存的结果。
+    """
+    def __init__(self, db, logger, ttl, max_entries, fingerprint, flush_interval=2, evict_interval=600):
+        self.db = db
+        self.logger = logger
+        self.ttl = ttl  # 结果有效期（秒）
+        self.max_entries = max_entries  # 最大保存条数
+        self.flush_interval = flush_interval  # 批量写入间隔（秒）
+        self.evict_interval = evict_interval  # 过期清理间隔（秒）
+        self.pending = {}  # 待写入的结果：摘要 -> (verdict, width, height, created_at)
+        self.lock = threading.Lock()
+        self.last_evict_time = 0
+        self._reset_if_changed(fingerprint)
+        flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        flush_thread.start()
+
+    def _reset_if_changed(self, fingerprint):
+        """模型或判定配置的指纹与上次保存时不同时，删除所有已保存的结果"""
+        try:
+            if self.db.get_config(VERDICT_FINGERPRINT_KEY) == fingerprint:
+                return
+            self.db.safe_execute("DELETE FROM image_verdict")
+            self.db.update_config(VERDICT_FINGERPRINT_KEY, fingerprint)
+            self.logger.info(I18n.get("verdict_store_reset"))
+        except Exception as e:
+            self.logger.exception(I18n.get("verdict_store_error", str(e)))
+
+    def get(self, digest):
+        """查找摘要对应的检测结果
+
+        Returns:
+            tuple or None: (检测结果, 图片尺寸)，未找到或已过期时返回 None
+        """
+        with self.lock:
+            record = self.pending.get(digest)
+        if record is None:
+            try:
+                record = self.db.fetchone(
+                    "SELECT verdict, width, height, created_at FROM image_verdict WHERE digest = ?",
+                    (digest,)
+                )
+            except Exception as e:
+                self.logger.exception(I18n.get("verdict_store_error", str(e)))
+                return None
+            if record is None:
+                return None
+        verdict, width, height, created_at = record
+        if time.time() - created_at > self.ttl:
+            return None
+        size = (width, height) if width is not None and height is not None else None
+        return bool(verdict), size
+
+    def put(self, digest, verdict, size=None):
+        """保存检测结果，实际写入由后台线程批量完成"""
+        width, height = size if size else (None, None)
+        with self.lock:
+            self.pending[digest] = (1 if verdict else 0, width, height, time.time())
+
+    def flush(self):
+        """将待写入的结果批量提交到数据库"""
+        with self.lock:
+            if not self.pending:
+                return
+            records = [(digest,) + record for digest, record in self.pending.items()]
+            self.pending = {}
+        try:
+            self.db.execute_many(
+                "INSERT OR REPLACE INTO image_verdict (digest, verdict, width, height, created_at) VALUES (?, ?, ?, ?, ?)",
+                records
+            )
+        except Exception as e:
+            self.logger.exception(I18n.get("verdict_store_error", str(e)))
+
+    def evict(self):
+        """删除过期的结果，并在超出容量时删除最早写入的结果"""
+        try:
+            self.db.safe_execute("DELETE FROM image_verdict WHERE created_at < ?", (time.time() - self.ttl,))
+            count = self.db.fetchone("SELECT COUNT(*) FROM image_verdict")[0]
+            if count > self.max_entries:
+                self.db.safe_execute(
+                    "DELETE FROM image_verdict WHERE digest IN "
+                    "(SELECT digest FROM image_verdict ORDER BY created_at LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+        except Exception as e:
+            self.logger.exception(I18n.get("verdict_store_error", str(e)))
+
+    def _flush_loop(self):
+        """后台批量写入和定期清理"""
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+            current_time = time.time()
+            if current_time - self.last_evict_time > self.evict_interval:
+                self.evict()
+                self.last_evict_time = current_time
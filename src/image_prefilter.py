@@ -0,0 +1,29 @@
+class ImagePreFilter:
+    """基于图片头信息的预过滤
+
+    只使用响应体大小和图片头中的尺寸、帧数判断，不解码像素数据。
+    跟踪像素、占位 GIF、小图标等低于阈值的图片直接放行，不进入推理流程。
+    """
+    def __init__(self, min_side, min_pixels, min_bytes):
+        self.min_side = min_side  # 宽或高低于该值时放行
+        self.min_pixels = min_pixels  # 所有帧的像素总数低于该值时放行
+        self.min_bytes = min_bytes  # 响应体小于该字节数时放行
+
+    def is_tiny_data(self, data_length):
+        """响应体是否小到不可能包含有意义的图像内容"""
+        return data_length < self.min_bytes
+
+    def is_trivial(self, width, height, count_frames):
+        """根据图片头中的尺寸和帧数判断是否无需检测
+
+        Args:
+            width: 图片宽度
+            height: 图片高度
+            count_frames: 返回帧数的函数，只在单帧面积不足时调用
+        """
+        if min(width, height) < self.min_side:
+            return True
+        if width * height >= self.min_pixels:
+            return False
+        # 单帧面积不足时才读取帧数，小尺寸图片遍历帧头的开销可以忽略
+        return width * height * count_frames() < self.min_pixels
@@ -0,0 +1,124 @@
+import struct
+
+# 在响应体开头查找 AVIF ispe 属性盒的最大范围（字节）
+AVIF_SEARCH_LIMIT = 65536
+
+# 携带图像尺寸的 JPEG 帧起始标记 (SOF0-SOF15，排除 DHT、JPG、DAC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# 可被识别为 AVIF 的 ftyp 品牌
+AVIF_BRANDS = {b'avif', b'avis'}
+
+class ImageInfo:
+    """通过文件头识别出的图片格式和尺寸"""
+    def __init__(self, format, size):
+        self.format = format  # 与 PIL 插件名称一致的格式名，如 JPEG、PNG、AVIF
+        self.size = size  # (宽, 高)，文件头中未找到时为 None
+
+def sniff_image(data):
+    """根据文件头的魔数识别图片格式，并在同一次扫描中读取尺寸
+
+    只读取文件头和必要的元数据段，不解码像素数据。
+
+    Returns:
+        ImageInfo or None: 无法识别为支持的图片格式或文件头被截断时返回 None
+    """
+    try:
+        return _sniff_header(data)
+    except (struct.error, IndexError):
+        return None  # 响应体在文件头中途被截断
+
+def _sniff_header(data):
+    """按魔数分派到各格式的尺寸解析"""
+    if data.startswith(b'\xff\xd8\xff'):
+        return ImageInfo('JPEG', _jpeg_size(data))
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        size = struct.unpack('>II', data[16:24]) if data[12:16] == b'IHDR' and len(data) >= 24 else None
+        return ImageInfo('PNG', size)
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        size = struct.unpack('<HH', data[6:10]) if len(data) >= 10 else None
+        return ImageInfo('GIF', size)
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return ImageInfo('WEBP', _webp_size(data))
+    if data[4:8] == b'ftyp' and _is_avif(data):
+        return ImageInfo('AVIF', _avif_size(data))
+    if data[:2] == b'BM':
+        return ImageInfo('BMP', _bmp_size(data))
+    if data[:4] in (b'II*\x00', b'MM\x00*'):
+        return ImageInfo('TIFF', _tiff_size(data))
+    return None
+
+def _jpeg_size(data):
+    """逐段跳过 JPEG 标记段，读取帧起始段中的尺寸"""
+    pos = 2
+    while pos + 9 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1  # 填充字节
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            pos += 2  # 无长度字段的标记
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + struct.unpack('>H', data[pos + 2:pos + 4])[0]
+    return None
+
+def _webp_size(data):
+    """读取 WebP 的有损 (VP8)、无损 (VP8L) 或扩展 (VP8X) 格式头中的尺寸"""
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and len(data) >= 30 and data[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(data) >= 25 and data[20] == 0x2F:
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(data) >= 30:
+        return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    return None
+
+def _is_avif(data):
+    """检查 ftyp 盒的主品牌和兼容品牌中是否包含 AVIF"""
+    box_size = int.from_bytes(data[:4], 'big')
+    if data[8:12] in AVIF_BRANDS:
+        return True
+    return any(data[pos:pos + 4] in AVIF_BRANDS for pos in range(16, min(box_size, len(data)), 4))
+
+def _avif_size(data):
+    """读取 AVIF 首个 ispe (图像空间范围) 属性盒中的尺寸"""
+    pos = data.find(b'ispe', 0, AVIF_SEARCH_LIMIT)
+    if pos < 0 or pos + 16 > len(data):
+        return None
+    # 类型后依次为 4 字节版本和标志、宽、高
+    return struct.unpack('>II', data[pos + 8:pos + 16])
+
+def _bmp_size(data):
+    """读取 BMP 信息头中的尺寸，高度为负表示自上而下存储"""
+    if len(data) < 26:
+        return None
+    header_size = struct.unpack('<I', data[14:18])[0]
+    if header_size == 12:
+        return struct.unpack('<HH', data[18:22])
+    width, height = struct.unpack('<ii', data[18:26])
+    return abs(width), abs(height)
+
+def _tiff_size(data):
+    """读取 TIFF 第一个 IFD 中的 ImageWidth (256) 和 ImageLength (257) 标签"""
+    order = '<' if data[:2] == b'II' else '>'
+    offset = struct.unpack(order + 'I', data[4:8])[0]
+    if offset + 2 > len(data):
+        return None
+    count = struct.unpack(order + 'H', data[offset:offset + 2])[0]
+    values = {}
+    for pos in range(offset + 2, min(offset + 2 + count * 12, len(data) - 11), 12):
+        tag, value_type = struct.unpack(order + 'HH', data[pos:pos + 4])
+        if tag in (256, 257):
+            # SHORT 类型的值位于值字段的前两个字节
+            fmt = order + ('H' if value_type == 3 else 'I')
+            values[tag] = struct.unpack(fmt, data[pos + 8:pos + 8 + struct.calcsize(fmt)])[0]
+    if 256 in values and 257 in values:
+        return values[256], values[257]
+    return None
@@ -0,0 +1,112 @@
+from collections import deque
+
+# 仅转换 ASCII 大写字母，保证转换前后字符位置一一对应
+ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+def _is_word_char(char):
+    """是否为英文词的组成字符 (ASCII 字母或数字)，空字符串视为词边界"""
+    return char.isascii() and char.isalnum()
+
+class KeywordMatcher:
+    """基于 Aho-Corasick 自动机的多关键词匹配
+
+    所有关键词构建为一个自动机，对文本只做一次线性扫描，耗时与关键词数量无关。
+    匹配时忽略 ASCII 字母大小写。
+
+    关键词支持敏感词表中用到的简化语法：
+        开头的 "." 表示关键词前至少还有一个字符
+        结尾的 "." 或 ".+" 表示关键词后至少还有一个字符
+        "\\" 转义其后的字符，如 "18\\+" 匹配 "18+"
+    按整词添加的关键词只匹配前后不是 ASCII 字母或数字的完整英文词。
+    """
+    def __init__(self):
+        self.goto = [{}]  # 状态 -> {字符: 下一状态}
+        self.fail = [0]  # 状态 -> 失配后跳转的状态
+        self.outputs = [[]]  # 状态 -> 在该状态结束的关键词序号（含后缀状态的输出）
+        self.keywords = []  # 序号 -> (原始关键词, 长度, 前面需要字符, 后面需要字符, 是否整词)
+
+    def add(self, word, whole_word=False):
+        """添加关键词，需在 build 之前调用"""
+        need_before = word.startswith('.')
+        body = word[1:] if need_before else word
+        need_after = False
+        for suffix in ('.+', '.'):
+            if body.endswith(suffix) and not body.endswith('\\' + suffix):
+                body = body[:-len(suffix)]
+                need_after = True
+                break
+        literal = []
+        escaped = False
+        for char in body:
+            if char == '\\' and not escaped:
+                escaped = True
+                continue
+            literal.append(char)
+            escaped = False
+        literal = ''.join(literal).translate(ASCII_LOWER)
+        if not literal:
+            return
+
+        state = 0
+        for char in literal:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            state = next_state
+        self.outputs[state].append(len(self.keywords))
+        self.keywords.append((word, len(literal), need_before, need_after, whole_word))
+
+    def build(self):
+        """按广度优先顺序计算失配跳转，并合并后缀状态的输出"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+                queue.append(next_state)
+
+    def find_all(self, text, first_only=False):
+        """扫描文本，按出现顺序返回匹配到的原始关键词（去重）
+
+        Args:
+            first_only: 为 True 时找到第一个关键词即停止扫描
+        """
+        matched = []
+        folded = text.translate(ASCII_LOWER)
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for end, char in enumerate(folded):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in outputs[state]:
+                if self._accepts(text, index, end):
+                    word = self.keywords[index][0]
+                    if word not in matched:
+                        matched.append(word)
+                    if first_only:
+                        return matched
+        return matched
+
+    def _accepts(self, text, index, end):
+        """检查在 end 处结束的关键词是否满足前后字符的约束"""
+        _, length, need_before, need_after, whole_word = self.keywords[index]
+        start = end - length + 1
+        before = text[start - 1] if start > 0 else ''
+        after = text[end + 1] if end + 1 < len(text) else ''
+        # 正则中的 "." 不匹配换行符
+        if need_before and before in ('', '\n'):
+            return False
+        if need_after and after in ('', '\n'):
+            return False
+        if whole_word and (_is_word_char(before) or _is_word_char(after)):
+            return False
+        return True
@@ -0,0 +1,52 @@
+import sys
+import ctypes
+import psutil
+from ctypes import wintypes
+
+# CreateMemoryResourceNotification 的通知类型：可用物理内存不足
+LOW_MEMORY_RESOURCE_NOTIFICATION = 0
+
+class MemoryPressureMonitor:
+    """系统内存压力信号
+
+    内存使用率超过 high_percent 时视为内存压力。Windows 上另外查询
+    CreateMemoryResourceNotification 创建的低内存通知对象，可用内存在使用率
+    达到阈值之前就已经很低时（如大内存机器上）也能及时触发；两个信号任一成立即可。
+    """
+    def __init__(self, high_percent):
+        self.high_percent = high_percent  # 视为内存压力的内存使用率
+        self.kernel32 = None
+        self.handle = None
+        if sys.platform == 'win32':
+            self._create_notification()
+
+    def _create_notification(self):
+        """创建低内存通知对象，失败时只按内存使用率判断"""
+        try:
+            kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+            kernel32.CreateMemoryResourceNotification.argtypes = [ctypes.c_int]
+            kernel32.CreateMemoryResourceNotification.restype = wintypes.HANDLE
+            kernel32.QueryMemoryResourceNotification.argtypes = [wintypes.HANDLE, ctypes.POINTER(wintypes.BOOL)]
+            kernel32.QueryMemoryResourceNotification.restype = wintypes.BOOL
+            kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+            kernel32.CloseHandle.restype = wintypes.BOOL
+            handle = kernel32.CreateMemoryResourceNotification(LOW_MEMORY_RESOURCE_NOTIFICATION)
+        except (AttributeError, OSError):
+            return
+        if handle:
+            self.kernel32 = kernel32
+            self.handle = handle
+
+    def under_pressure(self):
+        """当前系统是否处于内存压力下"""
+        if self.handle is not None:
+            state = wintypes.BOOL()
+            if self.kernel32.QueryMemoryResourceNotification(self.handle, ctypes.byref(state)) and state.value:
+                return True
+        return psutil.virtual_memory().percent > self.high_percent
+
+    def close(self):
+        """关闭通知对象句柄"""
+        if self.handle is not None:
+            self.kernel32.CloseHandle(self.handle)
+            self.handle = None
@@ -142,6 +142,12 @@ _translations: Dict[str, Dict[str, str]] = {
             'batch_enabled': "Batch processing enabled",
             'batch_disabled': "Batch processing disabled",
             'batch_cmd_invalid': "Invalid batch command, please use enable or disable",
+            'help_tune': "Detection settings: tune (list) | tune <name>=<value>",
+            'tune_header': "Detection settings (name = value  [allowed values]):",
+            'tune_value_display': "  {} = {}  [{}]",
+            'tune_unknown': "Unknown detection setting: {}",
+            'tune_invalid': "Invalid value for {}, allowed: {}",
+            'tune_set': "Set {} = {}, restart the proxy service to apply",
 
             # installer
             'main_service': "main service",
@@ -180,10 +186,29 @@ _translations: Dict[str, Dict[str, str]] = {
             "VALIDATION_RESULT": "Validation result: {}",
 
             # detect
-            'predict_result': "result：{}, {}",
+            'predict_result': "Prediction scores: {}, blocked: {}",
             'ONNX_runtime_error': "ONNX runtime error: {}",
             'cache_hit': "Image cache hit: {}",
+            'phash_cache_hit': "Perceptual hash cache hit: {}",
+            'content_cache_hit': "Image content cache hit: {}",
+            'verdict_store_error': "Error accessing persistent image verdict store: {}",
+            'verdict_store_reset': "Model or detection settings changed, cleared persisted image verdicts",
             'GIF_PROCESS_ERROR': "Error processing GIF image: {}",
+            'model_variant_selected': "Image model variant selected: {}",
+            'model_variant_written': "Model variant written to {}",
+            'model_variant_missing': "Model variant not found: {}",
+            'model_fixtures_missing': "No labelled fixture images found in {}",
+            'model_check_summary': "{}: {} samples, verdict agreement {:.2%}, max score diff {:.4f}, unsafe recall fp32 {:.2%} / variant {:.2%}",
+            'model_check_mismatch': "Verdict mismatch: {} (fp32: {}, variant: {})",
+            'model_check_passed': "Accuracy regression check passed for {}",
+            'model_check_failed': "Accuracy regression check failed for {}",
+            'skin_filter_stats': "Skin-tone pre-classifier: {} images checked, pass rate {:.2%}",
+            'batch_slo_stats': "Batch processing: {} images exceeded the {:.0f} ms latency target, per-image cost {:.1f} ms",
+            'skin_filter_summary': "Skin-tone pre-classifier: {} samples, pass rate {:.2%}, false negatives {} / {} unsafe ({:.2%})",
+            'skin_filter_false_negative': "Unsafe sample passed by pre-classifier: {} (skin {:.2%}, dominant colours {:.2%})",
+            'phash_check_summary': "Perceptual hash cache: {} samples, {} hits, {} wrong hits ({:.2%})",
+            'phash_check_wrong_hit': "Wrong perceptual hash hit: {} reused the verdict of {}",
+            'gif_sampling_check_summary': "GIF sampling ({}): {} frames, {} sampled, last sampled frame {}",
             # stream
             'VIDEO_STREAM_INTERCEPTED': "Video stream intercepted: {}",
             'VIDEO_STREAM_ERROR': "Error processing video stream: {}",
@@ -204,6 +229,8 @@ _translations: Dict[str, Dict[str, str]] = {
             "BLACKLIST_URL_INTERCEPTED": "Intercepted blacklisted URL request: {}",
             "STREAM_DATA_DETECTED": "Streaming data detected: {}",
             "SVG_IMAGE_SKIPPED": "SVG image processing skipped: {}",
+            "TINY_IMAGE_SKIPPED": "Tiny image processing skipped ({}x{}): {}",
+            "TINY_FILE_SKIPPED": "Tiny image file processing skipped ({} bytes): {}",
             "IMAGE_URL_INTERCEPTED": "Image interception URL: {}, Referer: {}",
             "IMAGE_PROCESS_TIMEOUT": "Image processing timeout: {}",
             "UNRECOGNIZED_IMAGE": "Unrecognized image file: {}",
@@ -217,6 +244,11 @@ _translations: Dict[str, Dict[str, str]] = {
             "BLACKLIST_CACHE_REFRESH_PAUSED": "Blacklist cache refresh has been paused",
             "BLACKLIST_CACHE_REFRESH_RESUMED": "Blacklist cache refresh has been resumed",
             "SENSITIVE_SEARCH_BLOCKED": "sensitive search blocked",
+            "SENSITIVE_WORD_MATCHED": "Sensitive word matched: {}",
+            "TEXT_MODEL_MISSING": "Text model enabled but model or vocabulary file not found: {}",
+            "TEXT_MODEL_ERROR": "Text model error: {}",
+            "TEXT_MODEL_TIMEOUT": "Text model exceeded the latency budget, page allowed: {}",
+            "TEXT_MODEL_FLAGGED": "Text model flagged page title: {}",
 
             # monitor
             "START_REGISTRY_MONITORING": "Start monitoring {}",
@@ -254,13 +286,13 @@ _translations: Dict[str, Dict[str, str]] = {
             'daemon_config_get_error': "Error getting configuration: {}",
             
             # AI检测相关
-            'memory_high_cleanup': "Memory usage is critically high at {}%, performed emergency resource cleanup based on {}",
-            'memory_medium_cleanup': "Memory usage is high at {}%, cleaned up partial cache based on {}",
+            'memory_pressure_trim': "Memory pressure detected, released {} KB of cached results and {} perceptual hashes",
             'inactive_session_released': "Released inactive model session for thread {}",
             'image_processing_timeout': "Image processing timeout (hash: {}), considered harmful content for security reasons",
             'batch_config_error': "Error reading batch config: {}",
             'batch_update_error': "Error updating batch config: {}",
             'batch_processing_error': "Error in batch processing: {}",
+            'config_read_error': "Error reading config {}: {}",
             
             # GUI相关
             'pipe_created': "Pipe created successfully.",
@@ -328,6 +360,12 @@ _translations: Dict[str, Dict[str, str]] = {
             'batch_enabled': "批量处理已启用",
             'batch_disabled': "批量处理已禁用",
             'batch_cmd_invalid': "无效的batch命令，请使用 enable 或 disable",
+            'help_tune': "检测参数设置 tune(列出全部) | tune <name>=<value>",
+            'tune_header': "检测参数 (名称 = 当前值  [取值范围]):",
+            'tune_value_display': "  {} = {}  [{}]",
+            'tune_unknown': "未知的检测参数: {}",
+            'tune_invalid': "{} 的值无效，取值范围: {}",
+            'tune_set': "设置 {} = {}，重启代理服务后生效",
 
             # installer
             'main_service': "主服务",
@@ -362,10 +400,29 @@ _translations: Dict[str, Dict[str, str]] = {
             "INSTALL_END": "===============安装结束===============",
 
             # detect
-            'predict_result': "预测结果：{}, {}",
+            'predict_result': "预测分数：{}, 是否拦截: {}",
             'ONNX_runtime_error': "ONNX运行时错误: {}",
             'cache_hit': "图像缓存命中: {}",
+            'phash_cache_hit': "感知哈希缓存命中: {}",
+            'content_cache_hit': "图像内容缓存命中: {}",
+            'verdict_store_error': "访问图像检测结果持久化存储时出错: {}",
+            'verdict_store_reset': "模型或检测配置已变化，已清空持久化的图像检测结果",
             'GIF_PROCESS_ERROR': "处理GIF图像时发生错误: {}",
+            'model_variant_selected': "已选择图像模型变体: {}",
+            'model_variant_written': "模型变体已写入 {}",
+            'model_variant_missing': "未找到模型变体: {}",
+            'model_fixtures_missing': "在 {} 中未找到带标签的样本图片",
+            'model_check_summary': "{}: 样本 {} 张，判定一致率 {:.2%}，最大分数差 {:.4f}，不适当内容召回率 fp32 {:.2%} / 变体 {:.2%}",
+            'model_check_mismatch': "判定不一致: {} (fp32: {}, 变体: {})",
+            'model_check_passed': "{} 精度回退检查通过",
+            'model_check_failed': "{} 精度回退检查未通过",
+            'skin_filter_stats': "肤色预分类: 已检查 {} 张图片，放行率 {:.2%}",
+            'batch_slo_stats': "批处理: {} 张图片超出 {:.0f} 毫秒的延迟目标，单张耗时 {:.1f} 毫秒",
+            'skin_filter_summary': "肤色预分类: 共 {} 个样本，放行率 {:.2%}，漏判 {} / {} 个不适当样本 ({:.2%})",
+            'skin_filter_false_negative': "被预分类放行的不适当样本: {} (肤色占比 {:.2%}，主色覆盖率 {:.2%})",
+            'phash_check_summary': "感知哈希缓存: 共 {} 个样本，命中 {} 次，误命中 {} 次 ({:.2%})",
+            'phash_check_wrong_hit': "感知哈希误命中: {} 复用了 {} 的检测结果",
+            'gif_sampling_check_summary': "动图抽帧 ({}): 共 {} 帧，抽取 {} 帧，最后一个抽取的帧为第 {} 帧",
 
             # stream
             'VIDEO_STREAM_INTERCEPTED': "视频流已拦截: {}",
@@ -470,6 +527,8 @@ _translations: Dict[str, Dict[str, str]] = {
             "BLACKLIST_URL_INTERCEPTED": "拦截黑名单 URL 请求: {}",
             "STREAM_DATA_DETECTED": "检测到流式数据: {}",
             "SVG_IMAGE_SKIPPED": "SVG 图像跳过处理: {}",
+            "TINY_IMAGE_SKIPPED": "过小的图像跳过处理 ({}x{}): {}",
+            "TINY_FILE_SKIPPED": "过小的图像文件跳过处理 ({} 字节): {}",
             "IMAGE_URL_INTERCEPTED": "图片拦截url：{}, Referer: {}",
             "IMAGE_PROCESS_TIMEOUT": "图像处理超时: {}",
             "UNRECOGNIZED_IMAGE": "无法识别的图像文件: {}",
@@ -483,6 +542,11 @@ _translations: Dict[str, Dict[str, str]] = {
             "BLACKLIST_CACHE_REFRESH_PAUSED": "黑名单缓存刷新已暂停",
             "BLACKLIST_CACHE_REFRESH_RESUMED": "黑名单缓存刷新已恢复",
             "SENSITIVE_SEARCH_BLOCKED": "敏感词拦截",
+            "SENSITIVE_WORD_MATCHED": "匹配到敏感词: {}",
+            "TEXT_MODEL_MISSING": "已启用文本模型，但未找到模型或词表文件: {}",
+            "TEXT_MODEL_ERROR": "文本模型出错: {}",
+            "TEXT_MODEL_TIMEOUT": "文本模型超出延迟预算，已放行页面: {}",
+            "TEXT_MODEL_FLAGGED": "文本模型判定页面标题不适当: {}",
 
             # monitor
             "START_REGISTRY_MONITORING": "开始监听 {}",
@@ -532,13 +596,13 @@ _translations: Dict[str, Dict[str, str]] = {
             'daemon_config_get_error': "获取配置错误: {}",
             
             # AI检测相关
-            'memory_high_cleanup': "内存使用率高达 {}%，基于{}已执行紧急资源释放",
-            'memory_medium_cleanup': "内存使用率 {}%，基于{}已清理部分缓存",
+            'memory_pressure_trim': "检测到内存压力，已释放 {} KB 缓存结果和 {} 个感知哈希",
             'inactive_session_released': "释放线程 {} 的不活跃模型会话",
             'image_processing_timeout': "图像处理超时 (哈希值: {}), 出于安全考虑将其视为有害内容",
             'batch_config_error': "读取批处理配置时出错: {}",
             'batch_update_error': "更新批处理配置时出错: {}",
             'batch_processing_error': "批处理过程中出错: {}",
+            'config_read_error': "读取配置 {} 时出错: {}",
             
             # GUI相关
             'pipe_created': "管道创建成功。",
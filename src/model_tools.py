@@ -0,0 +1,300 @@
+import io
+import os
+import sys
+import math
+import argparse
+import numpy as np
+from PIL import Image
+from i18n import I18n
+import onnxruntime as ort
+from preprocess import resize_for_model, to_rgb_array
+from skin_filter import SkinToneFilter, compute_skin_features
+from image_cache import PerceptualHashIndex, compute_phash
+from gif_sampling import sample_gif_frames
+from prediction import PredictionResult, default_label_thresholds
+from constants import (IMAGE_MODEL_FILE, IMAGE_MODEL_VARIANTS, IMAGE_LABELS,
+                       TEST_DIR, DEFAULT_CONFIG)
+
+# 被视为不适当内容的标签
+UNSAFE_LABELS = {'hentai', 'porn', 'sexy'}
+
+def load_fixture_arrays(fixture_dir=TEST_DIR):
+    """加载本地标注样本，目录结构为 <fixture_dir>/<标签>/<图片>
+
+    Returns:
+        tuple: (N x 224 x 224 x 3 的 uint8 图像数组, 标签列表, 文件路径列表)
+    """
+    arrays, labels, paths = [], [], []
+    for label in IMAGE_LABELS:
+        label_dir = os.path.join(fixture_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for file_name in sorted(os.listdir(label_dir)):
+            path = os.path.join(label_dir, file_name)
+            try:
+                with Image.open(path) as img:
+                    img_array = to_rgb_array(resize_for_model(img))
+            except Exception:
+                continue
+            arrays.append(img_array)
+            labels.append(label)
+            paths.append(path)
+    if not arrays:
+        return None, [], []
+    return np.stack(arrays), labels, paths
+
+def load_fixtures(fixture_dir=TEST_DIR):
+    """加载本地标注样本并归一化
+
+    Returns:
+        tuple: (N x 224 x 224 x 3 的归一化张量, 标签列表, 文件路径列表)
+    """
+    arrays, labels, paths = load_fixture_arrays(fixture_dir)
+    if arrays is None:
+        return None, [], []
+    return arrays.astype(np.float32) / 255.0, labels, paths
+
+def run_model(model_path, tensors, batch_size=16):
+    """使用指定模型对张量批量推理，返回 N x 5 的预测分数"""
+    session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+    output_name = session.get_outputs()[0].name
+    outputs = []
+    for start in range(0, len(tensors), batch_size):
+        outputs.append(session.run([output_name], {input_name: tensors[start:start + batch_size]})[0])
+    return np.concatenate(outputs)
+
+def verdicts(scores, thresholds=None):
+    """根据预测分数和各标签阈值计算是否为不适当内容，未指定阈值时使用默认配置"""
+    if thresholds is None:
+        thresholds = default_label_thresholds()
+    return PredictionResult(scores, thresholds).blocked
+
+def optimize_model(output_path=IMAGE_MODEL_VARIANTS['optimized']):
+    """离线执行图优化并序列化模型
+
+    只使用与硬件无关的 extended 级别，布局相关的优化仍在加载时完成。
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = output_path
+    ort.InferenceSession(IMAGE_MODEL_FILE, sess_options=options, providers=['CPUExecutionProvider'])
+    print(I18n.get("model_variant_written", output_path))
+
+class FixtureCalibrationReader:
+    """使用本地样本为静态量化提供校准数据"""
+    def __init__(self, input_name, tensors):
+        self.input_name = input_name
+        self.tensors = iter(tensors)
+
+    def get_next(self):
+        tensor = next(self.tensors, None)
+        if tensor is None:
+            return None
+        return {self.input_name: tensor[np.newaxis]}
+
+def quantize_model(output_path=IMAGE_MODEL_VARIANTS['int8'], fixture_dir=TEST_DIR):
+    """以本地样本为校准数据，将模型静态量化为 INT8 (QDQ 格式)"""
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+    tensors, _, _ = load_fixtures(fixture_dir)
+    if tensors is None:
+        print(I18n.get("model_fixtures_missing", fixture_dir))
+        return False
+    session = ort.InferenceSession(IMAGE_MODEL_FILE, providers=['CPUExecutionProvider'])
+    reader = FixtureCalibrationReader(session.get_inputs()[0].name, tensors)
+    quantize_static(
+        IMAGE_MODEL_FILE,
+        output_path,
+        reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    print(I18n.get("model_variant_written", output_path))
+    return True
+
+def check_variant(variant, fixture_dir=TEST_DIR, min_agreement=0.98, max_recall_drop=0.01):
+    """将模型变体与 FP32 模型在本地样本上对比，检查精度回退
+
+    Args:
+        variant: 模型变体名称
+        min_agreement: 与 FP32 模型判定结果一致的最低比例
+        max_recall_drop: 不适当内容召回率允许下降的最大值
+
+    Returns:
+        bool: 是否通过检查
+    """
+    variant_path = IMAGE_MODEL_VARIANTS[variant]
+    if not os.path.exists(variant_path):
+        print(I18n.get("model_variant_missing", variant_path))
+        return False
+    tensors, labels, paths = load_fixtures(fixture_dir)
+    if tensors is None:
+        print(I18n.get("model_fixtures_missing", fixture_dir))
+        return False
+
+    reference_scores = run_model(IMAGE_MODEL_FILE, tensors)
+    variant_scores = run_model(variant_path, tensors)
+    reference_verdicts = verdicts(reference_scores)
+    variant_verdicts = verdicts(variant_scores)
+
+    expected = np.array([label in UNSAFE_LABELS for label in labels])
+    unsafe_count = max(int(expected.sum()), 1)
+    reference_recall = (reference_verdicts & expected).sum() / unsafe_count
+    variant_recall = (variant_verdicts & expected).sum() / unsafe_count
+    agreement = (reference_verdicts == variant_verdicts).mean()
+    max_diff = np.abs(reference_scores - variant_scores).max()
+
+    print(I18n.get("model_check_summary", variant, len(labels), agreement, max_diff, reference_recall, variant_recall))
+    for index in np.flatnonzero(reference_verdicts != variant_verdicts):
+        print(I18n.get("model_check_mismatch", paths[index], reference_verdicts[index], variant_verdicts[index]))
+
+    passed = agreement >= min_agreement and reference_recall - variant_recall <= max_recall_drop
+    print(I18n.get("model_check_passed" if passed else "model_check_failed", variant))
+    return passed
+
+def check_skin_filter(fixture_dir=TEST_DIR, max_skin_ratio=None, flat_coverage=None,
+                      flat_max_skin_ratio=None, max_false_negative_rate=0.0):
+    """在本地样本上评估肤色预分类的放行率和漏判率
+
+    未指定的阈值使用 DEFAULT_CONFIG 中的默认值。
+
+    Args:
+        max_false_negative_rate: 允许被放行的不适当样本的最大比例
+
+    Returns:
+        bool: 漏判率是否不超过 max_false_negative_rate
+    """
+    arrays, labels, paths = load_fixture_arrays(fixture_dir)
+    if arrays is None:
+        print(I18n.get("model_fixtures_missing", fixture_dir))
+        return False
+    skin_filter = SkinToneFilter(
+        float(DEFAULT_CONFIG['skin_filter_max_ratio']) if max_skin_ratio is None else max_skin_ratio,
+        float(DEFAULT_CONFIG['skin_filter_flat_coverage']) if flat_coverage is None else flat_coverage,
+        float(DEFAULT_CONFIG['skin_filter_flat_max_ratio']) if flat_max_skin_ratio is None else flat_max_skin_ratio
+    )
+    false_negatives = []
+    unsafe_count = 0
+    for img_array, label, path in zip(arrays, labels, paths):
+        features = compute_skin_features(img_array)
+        passed = skin_filter.is_clearly_safe(features)
+        if label in UNSAFE_LABELS:
+            unsafe_count += 1
+            if passed:
+                false_negatives.append((path, features))
+
+    _, pass_rate = skin_filter.pass_rate()
+    false_negative_rate = len(false_negatives) / max(unsafe_count, 1)
+    print(I18n.get("skin_filter_summary", len(labels), pass_rate, len(false_negatives), unsafe_count, false_negative_rate))
+    for path, (skin_ratio, coverage) in false_negatives:
+        print(I18n.get("skin_filter_false_negative", path, skin_ratio, coverage))
+    return false_negative_rate <= max_false_negative_rate
+
+def check_phash(fixture_dir=TEST_DIR, max_distance=None, max_wrong_hit_rate=0.0):
+    """在本地样本上评估感知哈希缓存的误命中率
+
+    依次将样本写入感知哈希索引，后续样本命中的缓存项若安全性与自身标签不一致，
+    即为误命中。未指定的距离阈值使用 DEFAULT_CONFIG 中的默认值。
+
+    Returns:
+        bool: 误命中占命中的比例是否不超过 max_wrong_hit_rate
+    """
+    arrays, labels, paths = load_fixture_arrays(fixture_dir)
+    if arrays is None:
+        print(I18n.get("model_fixtures_missing", fixture_dir))
+        return False
+    if max_distance is None:
+        max_distance = int(DEFAULT_CONFIG['phash_max_distance'])
+    index = PerceptualHashIndex(max_distance, len(labels))
+    hit_count = 0
+    wrong_hits = []
+    for img_array, label, path in zip(arrays, labels, paths):
+        phash = compute_phash(img_array)
+        unsafe = label in UNSAFE_LABELS
+        cached = index.lookup(phash)
+        if cached is not None:
+            hit_count += 1
+            if cached[0] != unsafe:
+                wrong_hits.append((path, cached[1]))
+            continue
+        index.add(phash, (unsafe, path))
+
+    wrong_hit_rate = len(wrong_hits) / max(hit_count, 1)
+    print(I18n.get("phash_check_summary", len(labels), hit_count, len(wrong_hits), wrong_hit_rate))
+    for path, cached_path in wrong_hits:
+        print(I18n.get("phash_check_wrong_hit", path, cached_path))
+    return wrong_hit_rate <= max_wrong_hit_rate
+
+def check_gif_sampling(n_frames=75, strategy=None, max_frames=None):
+    """检查画面持续变化的动图中抽帧是否覆盖整段动画
+
+    生成每帧都是随机噪声的动图（每一帧都是场景切换），按抽帧策略抽帧后
+    最后一个选中帧距动画末尾不得超过两段的长度。未指定的参数使用 DEFAULT_CONFIG 中的默认值。
+
+    Returns:
+        bool: 抽帧数量不超过上限且覆盖到动画末尾
+    """
+    strategy = strategy or DEFAULT_CONFIG['gif_sample_strategy']
+    max_frames = max_frames or int(DEFAULT_CONFIG['gif_max_frames'])
+    rng = np.random.default_rng(0)
+    frames = [Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)) for _ in range(n_frames)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, 'GIF', save_all=True, append_images=frames[1:])
+    gif_img = Image.open(io.BytesIO(buffer.getvalue()))
+
+    indices = [frame_idx for frame_idx, _ in sample_gif_frames(
+        gif_img, strategy, max_frames, int(DEFAULT_CONFIG['gif_frame_stride']),
+        float(DEFAULT_CONFIG['gif_scene_threshold']))]
+    max_tail = 2 * math.ceil(n_frames / max_frames)
+    print(I18n.get("gif_sampling_check_summary", strategy, n_frames, len(indices), indices[-1]))
+    within_cap = strategy == 'all' or len(indices) <= max_frames
+    return within_cap and indices[-1] >= n_frames - 1 - max_tail
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="InPurity image model tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('optimize', help="serialize a graph-optimized model")
+    quantize_parser = subparsers.add_parser('quantize', help="quantize the model to INT8")
+    quantize_parser.add_argument('--fixtures', default=TEST_DIR)
+    check_parser = subparsers.add_parser('check', help="compare a model variant with the FP32 model")
+    check_parser.add_argument('variant', choices=[name for name in IMAGE_MODEL_VARIANTS if name != 'fp32'])
+    check_parser.add_argument('--fixtures', default=TEST_DIR)
+    check_parser.add_argument('--min-agreement', type=float, default=0.98)
+    check_parser.add_argument('--max-recall-drop', type=float, default=0.01)
+    skin_parser = subparsers.add_parser('skin-filter', help="evaluate the skin-tone pre-classifier on fixtures")
+    skin_parser.add_argument('--fixtures', default=TEST_DIR)
+    skin_parser.add_argument('--max-skin-ratio', type=float)
+    skin_parser.add_argument('--flat-coverage', type=float)
+    skin_parser.add_argument('--flat-max-skin-ratio', type=float)
+    skin_parser.add_argument('--max-false-negative-rate', type=float, default=0.0)
+    phash_parser = subparsers.add_parser('phash', help="evaluate the perceptual hash cache on fixtures")
+    phash_parser.add_argument('--fixtures', default=TEST_DIR)
+    phash_parser.add_argument('--max-distance', type=int)
+    phash_parser.add_argument('--max-wrong-hit-rate', type=float, default=0.0)
+    gif_parser = subparsers.add_parser('gif-sampling', help="check that GIF frame sampling covers the whole animation")
+    gif_parser.add_argument('--frames', type=int, default=75)
+    gif_parser.add_argument('--strategy', choices=['all', 'uniform', 'scene'])
+    gif_parser.add_argument('--max-frames', type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == 'optimize':
+        optimize_model()
+        return 0
+    if args.command == 'quantize':
+        return 0 if quantize_model(fixture_dir=args.fixtures) else 1
+    if args.command == 'skin-filter':
+        passed = check_skin_filter(args.fixtures, args.max_skin_ratio, args.flat_coverage,
+                                   args.flat_max_skin_ratio, args.max_false_negative_rate)
+        return 0 if passed else 1
+    if args.command == 'phash':
+        passed = check_phash(args.fixtures, args.max_distance, args.max_wrong_hit_rate)
+        return 0 if passed else 1
+    if args.command == 'gif-sampling':
+        passed = check_gif_sampling(args.frames, args.strategy, args.max_frames)
+        return 0 if passed else 1
+    passed = check_variant(args.variant, args.fixtures, args.min_agreement, args.max_recall_drop)
+    return 0 if passed else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,25 @@
+import numpy as np
+from constants import IMAGE_LABELS, DEFAULT_CONFIG
+
+def threshold_config_key(label):
+    """标签阈值在 config 表中的键"""
+    return f"image_threshold_{label}"
+
+def default_label_thresholds():
+    """按 IMAGE_LABELS 顺序排列的默认阈值向量"""
+    return np.array([float(DEFAULT_CONFIG[threshold_config_key(label)]) for label in IMAGE_LABELS], dtype=np.float32)
+
+class PredictionResult:
+    """批量推理的结构化结果
+
+    分数矩阵与按标签排列的阈值向量整体比较得到超阈值掩码，任一标签超过阈值的
+    图片判定为不适当内容。阈值为 1 的标签（如 neutral）不会参与判定。
+    """
+    def __init__(self, scores, thresholds):
+        self.scores = scores  # N x len(IMAGE_LABELS) 的分数矩阵
+        self.exceeded = scores > thresholds  # 每张图片各标签是否超过阈值
+        self.blocked = self.exceeded.any(axis=1)  # 每张图片是否为不适当内容
+
+    def label_scores(self, index):
+        """返回第 index 张图片各标签的分数"""
+        return dict(zip(IMAGE_LABELS, self.scores[index].tolist()))
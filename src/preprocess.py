@@ -0,0 +1,174 @@
+import threading
+import multiprocessing
+import numpy as np
+from io import BytesIO
+from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from image_cache import compute_image_hash, compute_phash
+from skin_filter import compute_skin_features
+from constants import IMAGE_INPUT_SIZE, IMAGE_REDUCING_GAP
+
+# 模型输入张量的形状和字节数
+TENSOR_SHAPE = (*IMAGE_INPUT_SIZE, 3)
+TENSOR_BYTES = int(np.prod(TENSOR_SHAPE)) * np.dtype(np.float32).itemsize
+
+def resize_for_model(img):
+    """将图像缩放到模型输入尺寸，尽量在解码阶段完成缩小
+
+    JPEG（含手机相机常见的 MPO 多图 JPEG）在加载像素前设置 draft 模式，由 libjpeg 按 1/2、1/4、1/8 的 DCT 缩放
+    直接解码到不小于目标尺寸的分辨率；其它格式先用整数倍 reduce 快速缩小，
+    再做最终重采样，避免在原始分辨率上进行高代价的插值。
+    """
+    if isinstance(img, JpegImageFile):
+        img.draft('RGB', IMAGE_INPUT_SIZE)
+    return img.resize(IMAGE_INPUT_SIZE, reducing_gap=IMAGE_REDUCING_GAP)
+
+def to_rgb_array(img):
+    """将缩放后的图像转换为 HxWx3 的数组，非 RGB 图像先转换，只复制一次像素数据"""
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return np.asarray(img)
+
+def normalize_into(img_array, out):
+    """将 uint8 图像数组缩放到 [0, 1] 并直接写入预分配的 float32 张量，不产生中间数组"""
+    np.multiply(img_array, np.float32(1 / 255.0), out=out)
+
+# 子进程中挂载的共享内存张量环
+_worker_shm = None
+_worker_tensors = None
+
+def _init_worker(shm_name, slot_count):
+    """子进程初始化：挂载父进程创建的共享内存张量环"""
+    global _worker_shm, _worker_tensors
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_tensors = np.ndarray((slot_count, *TENSOR_SHAPE), dtype=np.float32, buffer=_worker_shm.buf)
+
+def _preprocess_to_slot(image_data, slot, with_skin_features):
+    """子进程中执行：解码、缩放，并将归一化后的张量直接写入共享内存槽位
+
+    Returns:
+        tuple: (图像哈希, 感知哈希, 原始尺寸, 肤色预分类特征或 None)
+    """
+    img = Image.open(BytesIO(image_data))
+    original_size = img.size
+    img_array = to_rgb_array(resize_for_model(img))
+    normalize_into(img_array, _worker_tensors[slot])
+    skin_features = compute_skin_features(img_array) if with_skin_features else None
+    return compute_image_hash(img_array), compute_phash(img_array), original_size, skin_features
+
+class TensorRing:
+    """预分配的张量环
+
+    所有槽位位于同一块连续内存中，预处理时原地写入槽位，
+    批处理时连续的槽位可以直接切片作为批次输入，无需复制。
+
+    Args:
+        shared: 是否分配在共享内存中，供预处理子进程写入
+    """
+    def __init__(self, slot_count, shared=True):
+        self.slot_count = slot_count
+        self.shm = None
+        if shared:
+            self.shm = shared_memory.SharedMemory(create=True, size=slot_count * TENSOR_BYTES)
+            self.tensors = np.ndarray((slot_count, *TENSOR_SHAPE), dtype=np.float32, buffer=self.shm.buf)
+        else:
+            self.tensors = np.empty((slot_count, *TENSOR_SHAPE), dtype=np.float32)
+        self.in_use = [False] * slot_count
+        self.cursor = 0  # 下一次分配的起始位置，按顺序分配使相邻请求的槽位连续
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """分配一个空闲槽位，全部占用时阻塞等待"""
+        with self.condition:
+            while True:
+                for offset in range(self.slot_count):
+                    slot = (self.cursor + offset) % self.slot_count
+                    if not self.in_use[slot]:
+                        self.in_use[slot] = True
+                        self.cursor = (slot + 1) % self.slot_count
+                        return slot
+                self.condition.wait()
+
+    def release(self, slot):
+        """释放槽位"""
+        with self.condition:
+            self.in_use[slot] = False
+            self.condition.notify()
+
+    def gather(self, slots, out):
+        """取出多个槽位组成批次
+
+        槽位连续时直接返回共享内存上的切片视图，否则复制到预分配的 out 中
+        """
+        first = slots[0]
+        if slots == list(range(first, first + len(slots))):
+            return self.tensors[first:first + len(slots)]
+        return np.take(self.tensors, slots, axis=0, out=out[:len(slots)], mode='clip')
+
+    def close(self):
+        """释放共享内存"""
+        self.tensors = None
+        if self.shm is None:
+            return
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # 仍有张量视图引用时由进程退出回收映射
+        self.shm.unlink()
+
+class PreparedImage:
+    """预处理完成的图像，张量位于张量环槽位中，使用完毕后需要释放槽位"""
+    def __init__(self, ring, slot, img_hash, phash, original_size, skin_features=None):
+        self.ring = ring
+        self.slot = slot  # 张量环槽位
+        self.tensor = ring.tensors[slot]  # 归一化后的 224x224x3 float32 张量视图
+        self.img_hash = img_hash  # 像素内容哈希，用于精确缓存
+        self.phash = phash  # 感知哈希，用于相似图片缓存
+        self.original_size = original_size  # 原始图片尺寸
+        self.skin_features = skin_features  # 肤色预分类特征，未启用预分类时为 None
+
+    def release(self):
+        """释放张量环槽位"""
+        self.tensor = None
+        self.ring.release(self.slot)
+
+class PreprocessPool:
+    """多进程图像预处理池
+
+    解码、缩放和归一化在子进程中完成，不与 mitmproxy 事件循环争用 GIL。
+    归一化后的张量直接写入预分配的共享内存张量环，不经过管道序列化。
+    """
+    def __init__(self, max_workers, slot_count):
+        self.ring = TensorRing(slot_count)
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.ring.shm.name, slot_count)
+        )
+
+    def preprocess(self, image_data, with_skin_features=False):
+        """在子进程中预处理图片，阻塞等待结果
+
+        Args:
+            with_skin_features: 是否同时计算肤色预分类特征
+
+        Returns:
+            PreparedImage: 预处理完成的图像，调用方负责在推理完成后释放
+        """
+        slot = self.ring.acquire()
+        try:
+            img_hash, phash, original_size, skin_features = self.executor.submit(
+                _preprocess_to_slot, image_data, slot, with_skin_features
+            ).result()
+        except BaseException:
+            self.ring.release(slot)
+            raise
+        return PreparedImage(self.ring, slot, img_hash, phash, original_size, skin_features)
+
+    def shutdown(self):
+        """关闭进程池并释放共享内存"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.ring.close()
@@ -9,6 +9,8 @@ from prompt_toolkit import print_formatted_text
 
 from i18n import I18n as _
 from db_manager import DatabaseManager
+from config_rules import CONFIG_RULES, describe_rule, validate_config_value
+from constants import DEFAULT_CONFIG
 
 class ProxyConfigCompleter(Completer):
     """自定义命令补全器"""
@@ -19,6 +21,7 @@ class ProxyConfigCompleter(Completer):
             'port': self.complete_port,
             'upstream': self.complete_upstream,
             'batch': self.complete_batch,
+            'tune': self.complete_tune,
             'setopt': self.complete_empty,
             'delopt': self.complete_delopt,
             'select': self.complete_select,
@@ -71,6 +74,11 @@ class ProxyConfigCompleter(Completer):
         options = ['enable', 'disable']
         return [opt for opt in options if opt.startswith(text)]
     
+    def complete_tune(self, text):
+        if '=' in text:
+            return []
+        return [key for key in CONFIG_RULES if key.startswith(text)]
+    
     def complete_delopt(self, text):
         # 使用缓存减少数据库查询
         if self.options_cache is None or self._should_refresh_cache():
@@ -106,6 +114,7 @@ class ProxyConfig:
             'delopt': self.cmd_delopt,
             'select': self.cmd_select,
             'batch': self.cmd_batch,
+            'tune': self.cmd_tune,
             'restart': self.cmd_restart,
             'quit': self.cmd_quit,
             'help': self.cmd_help,
@@ -120,6 +129,7 @@ class ProxyConfig:
             'delopt': _.get('help_delopt'),
             'select': _.get('help_select'),
             'batch': _.get('help_batch'),
+            'tune': _.get('help_tune'),
             'restart': _.get('help_restart'),
             'quit': _.get('help_quit'),
             'help': _.get('help_help')
@@ -127,7 +137,7 @@ class ProxyConfig:
         
         # 命令分类 - 使用国际化
         self.categories = {
-            _.get('category_proxy_settings'): ['port', 'upstream', 'batch'],
+            _.get('category_proxy_settings'): ['port', 'upstream', 'batch', 'tune'],
             _.get('category_config_management'): ['setopt', 'delopt', 'select'],
             _.get('category_system_operations'): ['restart', 'quit']
         }
@@ -291,6 +301,35 @@ class ProxyConfig:
         except Exception as e:
             self.print_error(_.get('error_generic', str(e)))
     
+    def cmd_tune(self, arg):
+        if not arg:
+            # 列出所有检测配置项的当前值和取值范围
+            self.print_output(_.get('tune_header'))
+            for key in CONFIG_RULES:
+                value = self.db_manager.get_config(key)
+                self.print_output(_.get('tune_value_display', key, DEFAULT_CONFIG[key] if value is None else value, describe_rule(key)))
+            return
+        if '=' not in arg:
+            self.print_error(_.get('option_invalid'))
+            return
+
+        name, value = arg.split('=', 1)
+        name = name.strip()
+        if name not in CONFIG_RULES:
+            self.print_error(_.get('tune_unknown', name))
+            return
+        try:
+            value = validate_config_value(name, value)
+        except ValueError:
+            self.print_error(_.get('tune_invalid', name, describe_rule(name)))
+            return
+
+        try:
+            self.db_manager.update_config(name, value)
+            self.print_output(_.get('tune_set', name, value))
+        except Exception as e:
+            self.print_error(_.get('error_generic', str(e)))
+    
     def cmd_restart(self, _):
         self.send_restart_command()
     
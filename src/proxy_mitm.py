@@ -1,5 +1,7 @@
-import re
+import os
+import math
 import time
+import asyncio
 import base64
 import hashlib
 import threading
@@ -11,14 +13,23 @@ from datetime import date
 from mitmproxy import http
 from log import LogManager
 from threading import Timer
-from bs4 import BeautifulSoup
 from ai_detect import ImagePredictor
+from image_cache import compute_content_digest
+from image_sniff import ImageInfo, sniff_image
+from keyword_matcher import KeywordMatcher
+from typing import Optional
+from html_head import PageHead, parse_head
+from text_prefix import decompress_prefix, decode_text
+from text_classifier import TitleClassifier
 from db_manager import DatabaseManager
+from config_rules import read_config, parse_search_params
 from forbid_manager import ForbidEventManager
 from PIL import Image, UnidentifiedImageError
 from urllib.parse import urlparse, parse_qs
-from constants import (STREAMING_TYPES, SKIP_CONTENT_TYPES, IMAGE_EXTENSIONS, 
-                      TEXT_CONTENT_TYPES, PORN_WORDS_CN, PORN_WORDS_EN)
+from constants import (STREAMING_TYPES, SKIP_CONTENT_TYPES,
+                      TEXT_CONTENT_TYPES, PORN_WORDS_CN, PORN_WORDS_EN,
+                      IMAGE_FETCH_DEST_PRIORITY, IMAGE_OTHER_DEST_PRIORITY,
+                      SEARCH_QUERY_PARAMS, TEXT_MODEL_FILE, TEXT_VOCAB_FILE)
 
 class InPurityProxy:
     def __init__(self):
@@ -42,10 +53,20 @@ class InPurityProxy:
         self.CACHE_REFRESH_INTERVAL = 300  # 缓存刷新间隔（秒）
         self.cache_refresh_paused = False  # 缓存刷新暂停标志
 
-        # 预解码敏感词并转换为Set
+        # 预解码敏感词并转换为Set，同时构建多关键词匹配自动机
         self.sensitive_words_cn = set()
         self.sensitive_words_en = set()
+        self.keyword_matcher = KeywordMatcher()
         self._preload_sensitive_words()
+        self.blocked_words = set()  # 已拦截的搜索词，重复搜索时无需再次匹配
+        # 搜索引擎域名 -> 搜索词参数，配置中的域名覆盖默认表
+        self.search_query_params = {**SEARCH_QUERY_PARAMS, **parse_search_params(self._get_config('search_query_params'))}
+        # 标题检查只读取响应体开头的部分，可选同时检查 meta 描述和 og:title
+        self.title_scan_bytes = self._get_config('title_scan_kb', int) * 1024
+        self.title_check_meta = self._get_config('title_check_meta') == '1'
+        # 可选的标题文本分类模型，等待结果的时间不超过延迟预算
+        self.text_classifier = self._load_text_classifier()
+        self.text_latency_budget = self._get_config('text_latency_budget_ms', float) / 1000
         
         # 站点统计相关的线程锁
         self.stats_lock = threading.Lock()  # 用于保护站点统计数据的线程锁
@@ -135,6 +156,33 @@ class InPurityProxy:
         self.cache_refresh_paused = True
         self.logger.info(I18n.get("BLACKLIST_CACHE_REFRESH_PAUSED"))
     
+    def _get_config(self, key, converter=str):
+        """读取检测相关配置，见 config_rules.read_config"""
+        return read_config(self.db_manager, self.logger, key, converter)
+
+    def _load_text_classifier(self):
+        """启用文本模型且模型文件存在时加载标题分类器"""
+        if self._get_config('enable_text_model') != '1':
+            return None
+        if not os.path.exists(TEXT_MODEL_FILE) or not os.path.exists(TEXT_VOCAB_FILE):
+            self.logger.warning(I18n.get("TEXT_MODEL_MISSING", TEXT_MODEL_FILE))
+            return None
+        try:
+            return TitleClassifier(
+                self.logger,
+                TEXT_MODEL_FILE,
+                TEXT_VOCAB_FILE,
+                max_tokens=self._get_config('text_model_max_tokens', int),
+                max_batch_size=self._get_config('text_batch_size', int),
+                batch_wait=self._get_config('text_batch_wait_ms', float) / 1000,
+                threshold=self._get_config('text_model_threshold', float),
+                cache_bytes=self._get_config('text_cache_budget_kb', int) * 1024,
+                threads=self._get_config('text_model_threads', int)
+            )
+        except Exception as e:
+            self.logger.exception(I18n.get("TEXT_MODEL_ERROR", str(e)))
+            return None
+
     def resume_cache_refresh(self):
         """恢复黑名单缓存刷新"""
         self.cache_refresh_paused = False
@@ -142,7 +190,7 @@ class InPurityProxy:
         self.logger.info(I18n.get("BLACKLIST_CACHE_REFRESH_RESUMED"))
     
     def _preload_sensitive_words(self):
-        """预加载和解码敏感词到内存中"""
+        """预加载和解码敏感词到内存中，并构建敏感词匹配自动机"""
         # 加载中文敏感词
         for encoded_word in PORN_WORDS_CN:
             try:
@@ -158,6 +206,13 @@ class InPurityProxy:
                 self.sensitive_words_en.add(word)
             except Exception as e:
                 self.logger.exception(I18n.get("ERROR", e))
+        
+        # 中文敏感词按子串匹配，英文敏感词只匹配完整的英文词
+        for word in self.sensitive_words_cn:
+            self.keyword_matcher.add(word)
+        for word in self.sensitive_words_en:
+            self.keyword_matcher.add(word, whole_word=True)
+        self.keyword_matcher.build()
 
     def md5_hash(self, text):
         """
@@ -174,12 +229,7 @@ class InPurityProxy:
             return host_md5 in self.blacklist_cache
 
     def _is_image_request(self, flow: http.HTTPFlow, content_type: str) -> bool:
-        """判断是否为图片请求"""
-        # 检查 URL 扩展名
-        url = flow.request.url.lower()
-        if any(url.endswith(ext) for ext in IMAGE_EXTENSIONS):
-            return True
-            
+        """根据请求和响应头判断是否为图片请求，用于响应体到达之前的拦截"""
         # 检查 sec-fetch-dest
         if flow.request.headers.get("sec-fetch-dest", "") == "image":
             return True
@@ -209,6 +259,42 @@ class InPurityProxy:
             if self.is_blacklisted(referer):
                 flow.kill()
                 return
+        # 在请求发往上游之前检查搜索词
+        if self._is_sensitive_search(parsed_url):
+            flow.kill()
+            self.logger.info(I18n.get("SENSITIVE_SEARCH_BLOCKED"))
+            return
+
+    def _search_params(self, host):
+        """返回搜索引擎域名对应的搜索词参数，依次去掉子域名查找"""
+        labels = host.lower().split('.')
+        for index in range(len(labels) - 1):
+            params = self.search_query_params.get('.'.join(labels[index:]))
+            if params is not None:
+                return params
+        return None
+
+    def _is_sensitive_search(self, parsed_url) -> bool:
+        """检查搜索引擎请求的查询参数中是否包含敏感词"""
+        if not parsed_url.query or not parsed_url.hostname:
+            return False
+        params = self._search_params(parsed_url.hostname)
+        if params is None:
+            return False
+        query = parse_qs(parsed_url.query)
+        for param in params:
+            for value in query.get(param, ()):
+                search_text = value.strip()
+                if not search_text:
+                    continue
+                if search_text in self.blocked_words:
+                    return True
+                matched_words = self.keyword_matcher.find_all(search_text, first_only=True)
+                if matched_words:
+                    self.blocked_words.add(search_text)
+                    self.logger.info(I18n.get("SENSITIVE_WORD_MATCHED", matched_words[0]))
+                    return True
+        return False
 
     def responseheaders(self, flow: http.HTTPFlow) -> None:
         content_type = flow.response.headers.get("Content-Type", "").lower()
@@ -223,58 +309,108 @@ class InPurityProxy:
             flow.response.stream = True
             self.logger.info(I18n.get("STREAM_DATA_DETECTED", content_type))
     
-    def _contains_sensitive_keywords(self, html_content: str) -> bool:
-        """检查搜索词是否包含敏感关键词"""
-        if not html_content:
-            return False
+    def _get_html_prefix(self, flow: http.HTTPFlow) -> str:
+        """只解压和解码响应体开头到 </head> 或 title_scan_kb 为止的内容"""
+        raw = flow.response.raw_content
+        if not raw:
+            return ""
+        data = decompress_prefix(raw, flow.response.headers.get("Content-Encoding", ""), self.title_scan_bytes)
+        if data is None:
+            # 多重或不支持的压缩编码交给 mitmproxy 完整解压
+            data = flow.response.content[:self.title_scan_bytes]
+        return decode_text(data, flow.response.headers.get("Content-Type", ""))
+
+    def _parse_page_head(self, flow: http.HTTPFlow) -> Optional[PageHead]:
+        """解析页面标题（及可选的 meta 描述、og:title），解析失败时返回 None"""
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            title_tag = soup.find('title')
-            if title_tag:
-                title_text = title_tag.get_text(strip=True)
-                self.logger.info(f"page title: {title_text}")
-                # 检查中英文敏感词
-                english_word_pattern = re.compile(r'[a-zA-Z0-9]+')
-                english_term = english_word_pattern.findall(title_text)
-                for word in self.sensitive_words_cn:
-                    if re.search(word, title_text):
-                        return True
-                if english_term:
-                    for term in english_term:
-                        if term.lower() in self.sensitive_words_en:
-                            return True
+            html_content = self._get_html_prefix(flow)
+            if not html_content:
+                return None
+            head = parse_head(html_content, self.title_check_meta)
+            if head.title:
+                self.logger.info(f"page title: {head.title}")
+            return head
         except Exception as e:
             self.logger.exception(f"wrong resolve html: {e}")
+        return None
+
+    def _contains_sensitive_keywords(self, head: PageHead) -> bool:
+        """检查页面标题等文本是否包含敏感关键词"""
+        # 一次扫描同时检查中英文敏感词
+        for text in head.texts():
+            matched_words = self.keyword_matcher.find_all(text, first_only=True)
+            if matched_words:
+                self.logger.info(I18n.get("SENSITIVE_WORD_MATCHED", matched_words[0]))
+                return True
+        return False
+
+    async def _is_sensitive_text(self, head: PageHead) -> bool:
+        """使用文本模型检查页面标题等文本，超过延迟预算时先放行"""
+        texts = head.texts()
+        if self.text_classifier is None or not texts:
+            return False
+        # shield 保证超时取消等待时后台推理继续进行，结果写入缓存供后续请求使用
+        futures = [asyncio.shield(asyncio.wrap_future(self.text_classifier.classify(text))) for text in texts]
+        try:
+            verdicts = await asyncio.wait_for(asyncio.gather(*futures), timeout=self.text_latency_budget)
+        except asyncio.TimeoutError:
+            self.logger.debug(I18n.get("TEXT_MODEL_TIMEOUT", texts[0]))
+            return False
+        except Exception:
+            return False  # 推理错误已由分类器记录
+        if any(verdicts):
+            self.logger.info(I18n.get("TEXT_MODEL_FLAGGED", texts[0]))
+            return True
         return False
 
-    def response(self, flow: http.HTTPFlow) -> None:
+    async def response(self, flow: http.HTTPFlow) -> None:
         if flow.response.status_code == 200:
             content_type = flow.response.headers.get("Content-Type", "").lower()
             if any(content_type.startswith(type) for type in TEXT_CONTENT_TYPES):
-                try:
-                    html_text = flow.response.text
-                    if self._contains_sensitive_keywords(html_text):
-                        self.logger.info(I18n.get("SENSITIVE_SEARCH_BLOCKED"))
-                        flow.kill()
-                        return
-                except Exception:
-                    pass
+                head = self._parse_page_head(flow)
+                if head is not None and (self._contains_sensitive_keywords(head) or await self._is_sensitive_text(head)):
+                    self.logger.info(I18n.get("SENSITIVE_SEARCH_BLOCKED"))
+                    flow.kill()
+                    return
                 
             # 快速过滤掉不需要处理的内容类型
             if any(t in content_type for t in SKIP_CONTENT_TYPES):
                 return
                 
-            # 检查是否为图片请求
-            if self._is_image_request(flow, content_type):
-                # 跳过 SVG 和图标
-                if "svg" in content_type or "icon" in content_type:
-                    self.logger.info(I18n.get("SVG_IMAGE_SKIPPED", flow.request.url))
-                    return
-                    
-                self._handle_image_response(flow)
+            # 带压缩编码且未声明为图片的响应不做识别，避免为文本接口解压响应体
+            if "image" not in content_type and flow.response.headers.get("Content-Encoding"):
+                return
+
+            # 按文件头识别图片格式，SVG、图标等不支持的格式不会被识别
+            image_info = self._sniff_image(flow)
+            if image_info is not None:
+                await self._handle_image_response(flow, image_info)
+
+    def _get_image_data(self, flow: http.HTTPFlow) -> bytes:
+        """获取图片数据，data URL 中的图片需要先解码"""
+        if flow.request.url.startswith("data:image"):
+            base64_data = flow.request.url.split(",")[1]
+            return base64.b64decode(base64_data)
+        return flow.response.content
+
+    def _sniff_image(self, flow: http.HTTPFlow):
+        """根据文件头识别图片格式和尺寸，结果缓存在 flow.metadata 中
+
+        Returns:
+            ImageInfo or None: 不是支持的图片格式时返回 None
+        """
+        if "image_info" not in flow.metadata:
+            flow.metadata["image_info"] = sniff_image(self._get_image_data(flow) or b"")
+        return flow.metadata["image_info"]
+
+    async def _handle_image_response(self, flow: http.HTTPFlow, image_info: ImageInfo) -> None:
+        """处理图片响应
 
-    def _handle_image_response(self, flow: http.HTTPFlow) -> None:
-        """处理图片响应"""
+        推理在线程池中进行，这里只等待其结果，等待期间 mitmproxy 可以继续处理其它请求
+
+        Args:
+            image_info: 文件头识别出的图片格式和尺寸，用于选择解码器
+        """
         referer = flow.request.headers.get("Referer", None)
 
         if not referer:
@@ -285,82 +421,143 @@ class InPurityProxy:
         referer = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
             
         try:
-            # 处理图片数据
-            if flow.request.url.startswith("data:image"):
-                base64_data = flow.request.url.split(",")[1]
-                image_data = base64.b64decode(base64_data)
-            else:
-                image_data = flow.response.content
-
-            # 创建图片对象
-            if "avif" in flow.response.headers.get("Content-Type", "").lower() or flow.request.url.lower().endswith('.avif'):
-                avifimg = iio.imread(image_data)
-                if avifimg.ndim == 4:
-                    avifimg = np.squeeze(avifimg)
-                img = Image.fromarray(avifimg)
-            else:
-                img = Image.open(BytesIO(image_data))
+            image_data = self._get_image_data(flow)
+
+            # 响应体过小时无需计算摘要和解码
+            if self.predictor.prefilter.is_tiny_data(len(image_data)):
+                self.logger.debug(I18n.get("TINY_FILE_SKIPPED", len(image_data), flow.request.url))
+                return
+
+            # 按识别出的格式选择解码器，Image.open 只读取图片头；AVIF 由 imageio 完整解码，延后到查找缓存之后
+            is_avif = image_info.format == "AVIF"
+            img = None if is_avif else Image.open(BytesIO(image_data), formats=[image_info.format])
+            # 跟踪像素和小图标直接放行，不占用推理队列
+            header_size = image_info.size or (img.size if img is not None else None)
+            if header_size and self.predictor.prefilter.is_trivial(*header_size, lambda: getattr(img, 'n_frames', 1)):
+                self.logger.debug(I18n.get("TINY_IMAGE_SKIPPED", *header_size, flow.request.url))
+                return
 
-            # 异步处理图像
-            future = self.predictor.predict_async(img)
+            # 按原始内容摘要查找已有检测结果，命中时无需解码图片
+            # 响应带有 ETag 时先按验证头查找摘要，避免重复计算大图片的摘要
+            validator_key = self._get_validator_key(flow, image_data)
+            content_digest = self.predictor.lookup_validator(validator_key) if validator_key else None
+            if content_digest is None:
+                content_digest = compute_content_digest(image_data)
+                if validator_key:
+                    self.predictor.remember_validator(validator_key, content_digest)
+            cached = self.predictor.lookup_content(content_digest)
+            if cached is None and self.predictor.verdict_store is not None:
+                # 持久化存储的查询可能等待数据库连接或写锁，放到线程中执行，避免阻塞事件循环
+                cached = await asyncio.to_thread(self.predictor.lookup_stored, content_digest)
+            if cached is not None:
+                predict_result, image_size = cached
+                self._record_image_result(flow, referer, referer_root, predict_result, image_size)
+                return
+
+            if is_avif:
+                # AVIF 需要完整解码，放到线程中执行，避免阻塞事件循环
+                img = await asyncio.to_thread(self._decode_avif, image_data)
+
+            # 异步处理图像，预测时可能以缩小的分辨率解码，先记录原始尺寸
+            image_size = img.size
+            priority = self._image_priority(flow, referer, image_size, len(image_data))
+            if self.predictor.preprocess_pool is not None and not is_avif and not getattr(img, 'is_animated', False):
+                # 多进程后端：本进程只读取了图片头部，解码和预处理在子进程中完成
+                future = self.predictor.predict_bytes_async(image_data, content_digest, priority)
+            else:
+                future = self.predictor.predict_async(img, content_digest, priority)
             try:
-                predict_result = future.result(timeout=60)
-                
-                with self.stats_lock:
-                    # 检查 referer 是否仍然存在（可能已被清理）
-                    if referer not in self.site_stats:
-                        self.site_stats[referer] = {
-                            "root": referer_root, 
-                            "total_images": 0, 
-                            "problematic_images": 0,
-                            "features": set()  # 只保留问题图像特征
-                        }
-                    
-                    # 更新总图片数
-                    self.site_stats[referer]["total_images"] += 1
-                    
-                    # 如果检测到问题图片，更新统计
-                    if predict_result and predict_result != "No Module File":
-                        # 生成图像特征签名
-                        url_parts = urlparse(flow.request.url).path.split('/')
-                        filename = url_parts[-1] if url_parts else ""
-                        width, height = img.size
-                        image_feature = f"{width}x{height}_{filename}"
-                        
-                        # 检查是否已经记录过这个问题图像
-                        if image_feature not in self.site_stats[referer]["features"]:
-                            self.site_stats[referer]["problematic_images"] += 1
-                            self.site_stats[referer]["features"].add(image_feature)
-                        else:
-                            # 如果是已知的问题图像，减少总计数以抵消重复
-                            self.site_stats[referer]["total_images"] -= 1
-                        
-                        flow.response.status_code = 403
-                        flow.response.content = b"Forbidden"
-                        self.logger.info(I18n.get("IMAGE_URL_INTERCEPTED", flow.request.url, referer))
-                    
-                    # 重置计时器 - 不同类型的页面设置不同的延迟
-                    if referer in self.site_timers:
-                        # 检查是否超过最大延迟时间
-                        elapsed_time = time.time() - self.site_timers[referer]["start_time"]
-                        if elapsed_time < self.MAX_DELAY_TIME:
-                            # 未超过最大延迟时间，重置计时器
-                            self.site_timers[referer]["timer"].cancel()
-                            self.site_timers[referer]["timer"] = Timer(self.DELAY_TIME, self.print_final_stats, (referer,))
-                            self.site_timers[referer]["timer"].start()
-                    else:
-                        # 设置延迟时间
-                        self.site_timers[referer] = {"start_time": time.time(), "timer": None}
-                        self.site_timers[referer]["timer"] = Timer(self.DELAY_TIME, self.print_final_stats, (referer,))
-                        self.site_timers[referer]["timer"].start()
-                    
-            except TimeoutError:
+                predict_result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=60)
+                self._record_image_result(flow, referer, referer_root, predict_result, image_size)
+            except asyncio.TimeoutError:
                 self.logger.error(I18n.get("IMAGE_PROCESS_TIMEOUT", flow.request.url))
         except UnidentifiedImageError:
             self.logger.error(I18n.get("UNRECOGNIZED_IMAGE", flow.request.url))
         except Exception as e:
             self.logger.exception(I18n.get("IMAGE_PROCESS_ERROR", e))
 
+    def _image_priority(self, flow: http.HTTPFlow, referer: str, image_size, data_length: int) -> float:
+        """计算图片的推理优先级，数值越小越先处理
+
+        以 sec-fetch-dest 决定基础优先级，尺寸和响应体积越大、来源页面
+        已检测出的问题图片占比越高，优先级越高。
+        """
+        dest = flow.request.headers.get("sec-fetch-dest", "")
+        priority = IMAGE_FETCH_DEST_PRIORITY.get(dest, IMAGE_OTHER_DEST_PRIORITY)
+        # 面积和体积按对数计分，约 1 百万像素、1 MB 时达到上限
+        width, height = image_size
+        priority -= min(math.log2(max(width * height, 1)) / 20, 1.0)
+        priority -= min(math.log2(max(data_length, 1)) / 20, 1.0)
+        with self.stats_lock:
+            stats = self.site_stats.get(referer)
+            if stats and stats["total_images"] > 0:
+                priority -= stats["problematic_images"] / stats["total_images"]
+        return priority
+
+    def _decode_avif(self, image_data: bytes) -> Image.Image:
+        """解码 AVIF 图片"""
+        avifimg = iio.imread(image_data)
+        if avifimg.ndim == 4:
+            avifimg = np.squeeze(avifimg)
+        return Image.fromarray(avifimg)
+
+    def _get_validator_key(self, flow: http.HTTPFlow, image_data: bytes):
+        """根据 URL、ETag 和内容长度生成缓存验证键，没有 ETag 时返回 None"""
+        etag = flow.response.headers.get("ETag")
+        if not etag or flow.request.url.startswith("data:"):
+            return None
+        return f"{flow.request.url}|{etag}|{len(image_data)}"
+
+    def _record_image_result(self, flow: http.HTTPFlow, referer: str, referer_root: str, predict_result, image_size) -> None:
+        """根据检测结果更新站点统计，拦截问题图片"""
+        with self.stats_lock:
+            # 检查 referer 是否仍然存在（可能已被清理）
+            if referer not in self.site_stats:
+                self.site_stats[referer] = {
+                    "root": referer_root, 
+                    "total_images": 0, 
+                    "problematic_images": 0,
+                    "features": set()  # 只保留问题图像特征
+                }
+            
+            # 更新总图片数
+            self.site_stats[referer]["total_images"] += 1
+            
+            # 如果检测到问题图片，更新统计
+            if predict_result and predict_result != "No Module File":
+                # 生成图像特征签名
+                url_parts = urlparse(flow.request.url).path.split('/')
+                filename = url_parts[-1] if url_parts else ""
+                width, height = image_size
+                image_feature = f"{width}x{height}_{filename}"
+                
+                # 检查是否已经记录过这个问题图像
+                if image_feature not in self.site_stats[referer]["features"]:
+                    self.site_stats[referer]["problematic_images"] += 1
+                    self.site_stats[referer]["features"].add(image_feature)
+                else:
+                    # 如果是已知的问题图像，减少总计数以抵消重复
+                    self.site_stats[referer]["total_images"] -= 1
+                
+                flow.response.status_code = 403
+                flow.response.content = b"Forbidden"
+                self.logger.info(I18n.get("IMAGE_URL_INTERCEPTED", flow.request.url, referer))
+            
+            # 重置计时器 - 不同类型的页面设置不同的延迟
+            if referer in self.site_timers:
+                # 检查是否超过最大延迟时间
+                elapsed_time = time.time() - self.site_timers[referer]["start_time"]
+                if elapsed_time < self.MAX_DELAY_TIME:
+                    # 未超过最大延迟时间，重置计时器
+                    self.site_timers[referer]["timer"].cancel()
+                    self.site_timers[referer]["timer"] = Timer(self.DELAY_TIME, self.print_final_stats, (referer,))
+                    self.site_timers[referer]["timer"].start()
+            else:
+                # 设置延迟时间
+                self.site_timers[referer] = {"start_time": time.time(), "timer": None}
+                self.site_timers[referer]["timer"] = Timer(self.DELAY_TIME, self.print_final_stats, (referer,))
+                self.site_timers[referer]["timer"].start()
+
     def print_final_stats(self, referer):
         """
         打印每个网站的最终统计数据
@@ -462,6 +659,8 @@ class InPurityProxy:
     def done(self):
         """当代理关闭时调用"""
         self.predictor.cleanup()
+        if self.text_classifier is not None:
+            self.text_classifier.close()
         self.logger.info(I18n.get("PROXY_SERVICE_STOPPED"))
         self.log_manager.cleanup(script_name='mitmproxy')
         self.log_manager.cleanup(script_name='in_purity')
@@ -1,6 +1,9 @@
 import sys
-import proxy_mitm
-from mitmproxy.tools.main import mitmdump
+import multiprocessing
 
 if __name__ == "__main__":
-    mitmdump(sys.argv[1:])
\ No newline at end of file
+    # 打包后的程序需要支持预处理进程池以 spawn 方式启动子进程
+    multiprocessing.freeze_support()
+    import proxy_mitm
+    from mitmproxy.tools.main import mitmdump
+    mitmdump(sys.argv[1:])
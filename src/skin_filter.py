@@ -0,0 +1,68 @@
+import threading
+import numpy as np
+
+# RGB 到 YCbCr 色度分量 (Cb, Cr) 的转换矩阵 (ITU-R BT.601)，偏移量 128 单独相加
+CHROMA_WEIGHTS = np.array([
+    [-0.168736, 0.5],
+    [-0.331264, -0.418688],
+    [0.5, -0.081312],
+], dtype=np.float32)
+
+# YCbCr 空间中的肤色范围 (Chai & Ngan)
+SKIN_CB_RANGE = (77, 127)
+SKIN_CR_RANGE = (133, 173)
+
+# 颜色直方图每个通道的量化位数，以及统计覆盖率的主色数量
+HISTOGRAM_BITS = 4
+DOMINANT_COLORS = 8
+
+def compute_skin_features(img_array):
+    """计算肤色像素占比和主色覆盖率
+
+    Args:
+        img_array: 缩放后的 HxWx3 uint8 图像数组
+
+    Returns:
+        tuple: (肤色像素占比, 出现最多的若干种量化颜色覆盖的像素占比)
+    """
+    chroma = img_array.reshape(-1, 3).astype(np.float32) @ CHROMA_WEIGHTS + 128
+    cb, cr = chroma[:, 0], chroma[:, 1]
+    skin = (cb >= SKIN_CB_RANGE[0]) & (cb <= SKIN_CB_RANGE[1]) & (cr >= SKIN_CR_RANGE[0]) & (cr <= SKIN_CR_RANGE[1])
+
+    # 图表、截图、文字和扁平界面的颜色集中在少数几种
+    quantized = (img_array.reshape(-1, 3) >> (8 - HISTOGRAM_BITS)).astype(np.uint16)
+    color_index = (quantized[:, 0] << (2 * HISTOGRAM_BITS)) | (quantized[:, 1] << HISTOGRAM_BITS) | quantized[:, 2]
+    counts = np.bincount(color_index, minlength=1 << (3 * HISTOGRAM_BITS))
+    coverage = np.partition(counts, -DOMINANT_COLORS)[-DOMINANT_COLORS:].sum() / color_index.size
+    return float(skin.mean()), float(coverage)
+
+class SkinToneFilter:
+    """基于肤色占比和颜色直方图的快速预分类
+
+    几乎不含肤色的图片，或颜色集中且肤色较少的扁平图片直接判定为安全，
+    其余图片仍交给模型检测。只放行有把握的图片，不会直接判定不适当内容。
+    """
+    def __init__(self, max_skin_ratio, flat_coverage, flat_max_skin_ratio):
+        self.max_skin_ratio = max_skin_ratio  # 肤色占比低于该值时放行
+        self.flat_coverage = flat_coverage  # 主色覆盖率不低于该值时视为扁平图片
+        self.flat_max_skin_ratio = flat_max_skin_ratio  # 扁平图片肤色占比低于该值时放行
+        self.checked_count = 0  # 经过预分类的图片数量
+        self.passed_count = 0  # 直接放行的图片数量
+        self.lock = threading.Lock()
+
+    def is_clearly_safe(self, features):
+        """根据 compute_skin_features 的结果判断图片是否可以不经模型直接放行"""
+        skin_ratio, coverage = features
+        safe = skin_ratio < self.max_skin_ratio or \
+            (coverage >= self.flat_coverage and skin_ratio < self.flat_max_skin_ratio)
+        with self.lock:
+            self.checked_count += 1
+            if safe:
+                self.passed_count += 1
+        return safe
+
+    def pass_rate(self):
+        """返回 (经过预分类的图片数量, 直接放行的比例)"""
+        with self.lock:
+            checked, passed = self.checked_count, self.passed_count
+        return checked, passed / checked if checked else 0.0
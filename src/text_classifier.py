@@ -0,0 +1,209 @@
+import time
+import queue
+import threading
+import unicodedata
+import numpy as np
+import onnxruntime as ort
+from i18n import I18n
+from concurrent.futures import Future
+from image_cache import ClockCache
+
+# 模型输出中表示不适当内容的类别序号
+TEXT_UNSAFE_INDEX = 1
+
+# 视为 CJK 字符的 Unicode 区段，与 BERT 分词器一致，每个字单独成词
+CJK_RANGES = [
+    (0x4E00, 0x9FFF), (0x3400, 0x4DBF), (0x20000, 0x2A6DF), (0x2A700, 0x2B73F),
+    (0x2B740, 0x2B81F), (0x2B820, 0x2CEAF), (0xF900, 0xFAFF), (0x2F800, 0x2FA1F),
+]
+
+def normalize_text(text):
+    """标题的规范化形式：NFKC、小写、合并空白，用作结果缓存的键"""
+    return ' '.join(unicodedata.normalize('NFKC', text).lower().split())
+
+def _is_cjk(code_point):
+    return any(low <= code_point <= high for low, high in CJK_RANGES)
+
+def _is_punctuation(char):
+    code_point = ord(char)
+    if 33 <= code_point <= 47 or 58 <= code_point <= 64 or 91 <= code_point <= 96 or 123 <= code_point <= 126:
+        return True
+    return unicodedata.category(char).startswith('P')
+
+class WordPieceTokenizer:
+    """BERT / ERNIE 使用的 WordPiece 分词器
+
+    先按空白、标点和 CJK 字符切分，再对每个词按词表做最长前缀匹配，
+    后续子词以 "##" 开头。
+    """
+    def __init__(self, vocab_file, max_word_chars=100):
+        with open(vocab_file, encoding='utf-8') as f:
+            self.vocab = {line.rstrip('\n'): index for index, line in enumerate(f)}
+        self.max_word_chars = max_word_chars  # 超过该长度的词直接视为未知词
+        self.unk_id = self.vocab['[UNK]']
+        self.cls_id = self.vocab['[CLS]']
+        self.sep_id = self.vocab['[SEP]']
+        self.pad_id = self.vocab['[PAD]']
+
+    def _basic_tokenize(self, text):
+        """按空白、标点和 CJK 字符切分，并去除重音符号"""
+        text = unicodedata.normalize('NFD', text.lower())
+        words = []
+        word = []
+        for char in text:
+            code_point = ord(char)
+            if char.isspace():
+                if word:
+                    words.append(''.join(word))
+                    word = []
+            elif code_point in (0, 0xFFFD) or unicodedata.category(char) in ('Cc', 'Cf', 'Mn'):
+                continue
+            elif _is_cjk(code_point) or _is_punctuation(char):
+                if word:
+                    words.append(''.join(word))
+                    word = []
+                words.append(char)
+            else:
+                word.append(char)
+        if word:
+            words.append(''.join(word))
+        return words
+
+    def _word_ids(self, word):
+        """对单个词做最长前缀匹配，无法切分时返回 [UNK]"""
+        if len(word) > self.max_word_chars:
+            return [self.unk_id]
+        ids = []
+        start = 0
+        while start < len(word):
+            end = len(word)
+            while end > start:
+                piece = word[start:end] if start == 0 else '##' + word[start:end]
+                piece_id = self.vocab.get(piece)
+                if piece_id is not None:
+                    break
+                end -= 1
+            else:
+                return [self.unk_id]
+            ids.append(piece_id)
+            start = end
+        return ids
+
+    def encode(self, text, max_tokens):
+        """编码为 [CLS] ... [SEP]，总长度不超过 max_tokens"""
+        ids = [self.cls_id]
+        for word in self._basic_tokenize(text):
+            ids.extend(self._word_ids(word))
+            if len(ids) >= max_tokens - 1:
+                break
+        ids = ids[:max_tokens - 1]
+        ids.append(self.sep_id)
+        return ids
+
+    def encode_batch(self, texts, max_tokens):
+        """批量编码并补齐到批次内的最大长度
+
+        Returns:
+            dict: input_ids、token_type_ids、attention_mask，均为 N x L 的 int64 数组
+        """
+        encoded = [self.encode(text, max_tokens) for text in texts]
+        length = max(len(ids) for ids in encoded)
+        input_ids = np.full((len(encoded), length), self.pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(encoded), length), dtype=np.int64)
+        for row, ids in enumerate(encoded):
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+        return {
+            'input_ids': input_ids,
+            'token_type_ids': np.zeros_like(input_ids),
+            'attention_mask': attention_mask,
+        }
+
+class TitleClassifier:
+    """页面标题的文本分类模型
+
+    请求进入队列后由后台线程合批推理，短时间内到达的标题共用一次模型调用；
+    相同规范化标题的结果直接从缓存返回。调用方应按延迟预算等待结果，
+    超时时先放行页面，结果仍会写入缓存供后续请求使用。
+    """
+    def __init__(self, logger, model_file, vocab_file, max_tokens, max_batch_size, batch_wait,
+                 threshold, cache_bytes, threads):
+        self.logger = logger
+        self.tokenizer = WordPieceTokenizer(vocab_file)
+        self.max_tokens = max_tokens  # 每个标题的最大 token 数（含 [CLS]、[SEP]）
+        self.max_batch_size = max_batch_size  # 批次大小上限
+        self.batch_wait = batch_wait  # 收到第一个请求后等待合批的最长时间（秒）
+        self.threshold = threshold  # 不适当类别的概率阈值
+        self.cache = ClockCache(cache_bytes)  # 规范化标题 -> 是否不适当
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_file, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.output_name = self.session.get_outputs()[0].name
+
+        self.requests = queue.Queue()  # (规范化标题, Future)
+        self.running = True
+        self.worker = threading.Thread(target=self._batch_loop, daemon=True)
+        self.worker.start()
+
+    def classify(self, text):
+        """提交标题，返回 Future，结果为是否判定为不适当内容"""
+        key = normalize_text(text)
+        future = Future()
+        cached = self.cache.get(key)
+        if cached is not None:
+            future.set_result(cached)
+            return future
+        self.requests.put((key, future))
+        return future
+
+    def _collect_batch(self):
+        """阻塞等待第一个请求，再在 batch_wait 内收集更多请求"""
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self):
+        while self.running:
+            batch = [item for item in self._collect_batch() if item is not None]
+            if not batch:
+                continue
+            # 同一批次中的重复标题只推理一次
+            texts = list(dict.fromkeys(key for key, _ in batch))
+            try:
+                verdicts = dict(zip(texts, self._predict(texts)))
+            except Exception as e:
+                self.logger.exception(I18n.get("TEXT_MODEL_ERROR", str(e)))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for key, verdict in verdicts.items():
+                self.cache.put(key, verdict)
+            for key, future in batch:
+                if not future.done():
+                    future.set_result(verdicts[key])
+
+    def _predict(self, texts):
+        """对一批标题推理，返回各标题是否为不适当内容"""
+        encoded = self.tokenizer.encode_batch(texts, self.max_tokens)
+        logits = self.session.run([self.output_name], {name: encoded[name] for name in self.input_names})[0]
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return [bool(probability > self.threshold) for probability in probabilities[:, TEXT_UNSAFE_INDEX]]
+
+    def close(self):
+        """停止后台线程"""
+        self.running = False
+        self.requests.put(None)
@@ -0,0 +1,107 @@
+import re
+import zlib
+import brotli
+import zstandard
+
+# 每次解压输出的最大字节数
+DECOMPRESS_CHUNK = 16384
+# brotli 解压无法限制单次输出，按较小的输入块送入以限制压缩炸弹的放大
+BROTLI_INPUT_CHUNK = 1024
+
+HEAD_END_PATTERN = re.compile(rb'</head\s*>', re.IGNORECASE)
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+# 按 WHATWG 编码标准，页面声明的编码实际按其超集解码
+CHARSET_ALIASES = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'iso-8859-1': 'cp1252', 'ascii': 'cp1252'}
+
+def _iter_zlib(raw, wbits):
+    """按块解压 gzip / zlib / 原始 deflate 数据，每块输出不超过 DECOMPRESS_CHUNK"""
+    decompressor = zlib.decompressobj(wbits)
+    for offset in range(0, len(raw), DECOMPRESS_CHUNK):
+        data = raw[offset:offset + DECOMPRESS_CHUNK]
+        while data and not decompressor.eof:
+            yield decompressor.decompress(data, DECOMPRESS_CHUNK)
+            data = decompressor.unconsumed_tail
+        if decompressor.eof:
+            return
+
+def _iter_deflate(raw):
+    """HTTP deflate 编码可能带 zlib 头，也可能是原始 deflate 流"""
+    has_zlib_header = len(raw) >= 2 and raw[0] & 0x0F == 8 and (raw[0] << 8 | raw[1]) % 31 == 0
+    return _iter_zlib(raw, zlib.MAX_WBITS if has_zlib_header else -zlib.MAX_WBITS)
+
+def _iter_brotli(raw):
+    decompressor = brotli.Decompressor()
+    for offset in range(0, len(raw), BROTLI_INPUT_CHUNK):
+        yield decompressor.process(raw[offset:offset + BROTLI_INPUT_CHUNK])
+        if decompressor.is_finished():
+            return
+
+def _iter_zstd(raw):
+    reader = zstandard.ZstdDecompressor().stream_reader(raw)
+    while True:
+        chunk = reader.read(DECOMPRESS_CHUNK)
+        if not chunk:
+            return
+        yield chunk
+
+def _iter_identity(raw):
+    for offset in range(0, len(raw), DECOMPRESS_CHUNK):
+        yield raw[offset:offset + DECOMPRESS_CHUNK]
+
+# Content-Encoding -> 按块解压的生成器
+DECODERS = {
+    '': _iter_identity,
+    'identity': _iter_identity,
+    'gzip': lambda raw: _iter_zlib(raw, 16 + zlib.MAX_WBITS),
+    'x-gzip': lambda raw: _iter_zlib(raw, 16 + zlib.MAX_WBITS),
+    'deflate': _iter_deflate,
+    'br': _iter_brotli,
+    'zstd': _iter_zstd,
+}
+
+def decompress_prefix(raw, content_encoding, max_bytes):
+    """增量解压响应体，读到 </head> 或 max_bytes 字节即停止
+
+    Args:
+        raw: 未解压的原始响应体
+        content_encoding: Content-Encoding 响应头
+
+    Returns:
+        bytes or None: 解压得到的开头部分，不支持的编码返回 None
+    """
+    decoder = DECODERS.get(content_encoding.strip().lower())
+    if decoder is None:
+        return None
+    prefix = bytearray()
+    try:
+        for chunk in decoder(raw):
+            # 从上一块末尾附近开始查找，避免 </head> 被块边界切开
+            search_start = max(0, len(prefix) - 8)
+            prefix += chunk
+            head_end = HEAD_END_PATTERN.search(prefix, search_start)
+            if head_end:
+                del prefix[head_end.end():]
+                break
+            if len(prefix) >= max_bytes:
+                del prefix[max_bytes:]
+                break
+    except (zlib.error, brotli.error, zstandard.ZstdError):
+        pass  # 响应体截断或损坏时使用已解压的部分
+    return bytes(prefix)
+
+def decode_text(data, content_type):
+    """按 Content-Type 或 <meta charset> 声明的编码解码，默认 UTF-8
+
+    截断处不完整的字符和无法解码的字节会被替换。
+    """
+    charset = content_type.lower().partition('charset=')[2].split(';')[0].strip(' "\'')
+    if not charset:
+        match = META_CHARSET_PATTERN.search(data)
+        if match:
+            charset = match.group(1).decode('ascii').lower()
+    charset = CHARSET_ALIASES.get(charset, charset)
+    try:
+        return data.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        return data.decode('utf-8', errors='replace')